@@ -0,0 +1,235 @@
+# benchmark harness, timing calc_v1.py and calc_v2.py phase by phase
+#   on the game recipe set, as a baseline, and on synthetic recipe graphs of increasing size (calc_v2 only)
+# each benchmark runs --repeat times, keeping the fastest time of each phase
+#   then once more under tracemalloc, for the peak memory allocated by each phase (tracemalloc slows python down, so that run is not timed)
+# results are printed as a table, or as json lines with --format jsonl, one record per phase, for comparing runs
+#   python bench.py --sizes 100 1000 10000 --format jsonl --output bench.jsonl
+
+# imports
+import argparse
+import io
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import calc_v1
+import calc_v2
+import recipe_data
+
+
+class phase_timer():
+    # records the wall time of each named phase, or with trace_memory, the peak memory allocated during each phase
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    @contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if self.trace_memory:
+                self.results[name] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            else:
+                self.results[name] = seconds
+
+
+def synthetic_recipes(n_recipes, seed=0, n_layers=8, byproduct_rate=0.1):
+    # returns (recipes, target) for a synthetic calc_v2 recipe graph of n_recipes, shaped like the game recipes
+    #   recipes form a layered DAG, of n_layers, as deep as the game's longest production chains
+    #   the first layer consumes raw_inputs, every other recipe consumes 1 to 4 ingredients of lower layers, at least one from the layer below
+    #   byproduct_rate of recipes also output a by-product, one of the inputs of one of their input recipes
+    #     forming cycles like the water recycling of alumina solution and aluminum scrap
+    #     returning half of what that input recipe consumes to feed the recipe, so the recycled ingredient is still consumed overall, and every plan is non-negative
+    # target is every ingredient of the top layer
+    rng = random.Random(seed)
+    machines = [machine for machine in calc_v2.machine_order if calc_v2.machine_power[machine] > 0]
+    width = max(1, math.ceil(n_recipes / n_layers))
+
+    layers, recipes = [], {}
+    for i in range(n_recipes):
+        i_layer, i_recipe = divmod(i, width)
+        if i_recipe == 0:
+            layers.append([])
+        name = f'part {i_layer} {i_recipe}'
+        layers[-1].append(name)
+
+        if i_layer == 0:
+            input_names = rng.sample(calc_v2.raw_inputs, rng.randint(1, 2))
+        else:
+            # the first input cycles through the layer below, so that every ingredient is used
+            below = layers[i_layer - 1]
+            input_names = [below[i_recipe % len(below)]]
+            for _ in range(rng.randint(0, 3)):
+                input_name = rng.choice(layers[rng.randrange(i_layer)])
+                if input_name not in input_names:
+                    input_names.append(input_name)
+
+        inputs = [calc_v2.ingredient(name = input_name, number = rng.randint(1, 3)) for input_name in input_names]
+        outputs = [calc_v2.ingredient(name = name, number = rng.randint(1, 3))]
+        if i_layer > 0 and rng.random() < byproduct_rate:
+            i_input = rng.randrange(len(inputs))
+            input_recipe = recipes[inputs[i_input].name]
+            byproduct = rng.choice(input_recipe.inputs)
+            if byproduct.name not in input_names:
+                # per unit of this recipe, its input recipe consumes inputs[i_input].number / primary output number times byproduct.number
+                number = inputs[i_input].number * byproduct.number / input_recipe.primary_output.number / 2
+                outputs.append(calc_v2.ingredient(name = byproduct.name, number = math.floor(number * 1000) / 1000, is_primary = False))
+
+        recipes[name] = calc_v2.recipe(inputs = inputs, outputs = outputs, rate = rng.randint(1, 60), machine = rng.choice(machines))
+
+    target = [calc_v2.ingredient(name = name, number = 10) for name in layers[-1]]
+    return recipes, target
+
+
+def print_lines(production_lines):
+    # formats production lines as main does, to a string
+    out = io.StringIO()
+    print(f'Production Lines ({len(production_lines)})', file = out)
+    for line in production_lines:
+        print(str(line), file = out)
+    return out.getvalue()
+
+
+def bench_v1(timer, target):
+    # calc_v1 phases, on the game recipes
+    with timer.phase('load recipes'):
+        recipe_data.cache.clear()
+        calc_v1.load_recipes.cache_clear()
+        calc_v1.unit_requirements.cache_clear()
+        n_recipes = len(calc_v1.load_recipes())
+
+    with timer.phase('expansion'):
+        steps = calc_v1.consolidate_production_steps(target)
+
+    with timer.phase('production lines'):
+        production_lines = [calc_v1.production_line(v) for k,v in steps.items()]
+
+    with timer.phase('ordering'):
+        production_lines.sort(key=lambda x: x.sort_key)
+
+    with timer.phase('printing'):
+        print_lines(production_lines)
+
+    return n_recipes, len(production_lines)
+
+
+def bench_v2(timer, solver_backend, n_recipes=None, seed=0):
+    # calc_v2 phases, on the game recipes, or with n_recipes, on synthetic recipes
+    if n_recipes is None:
+        with timer.phase('load recipes'):
+            recipe_data.cache.clear()
+            calc_v2.build_recipes.cache_clear()
+            p = calc_v2.planner(solver_backend = solver_backend)
+            p.recipes
+        target = [calc_v2.ingredient(name = 'supercomputer', number = 1.875)]
+    else:
+        with timer.phase('generate'):
+            recipes, target = synthetic_recipes(n_recipes, seed)
+            p = calc_v2.planner(solver_backend = solver_backend, recipes = recipes)
+
+    with timer.phase('matrix build'):
+        p.recipe_matrix
+
+    if solver_backend == 'scipy':
+        with timer.phase('factorize'):
+            p.factorization
+
+    with timer.phase('solve'):
+        solution = p.backend_solution(target)
+
+    with timer.phase('float conversion'):
+        solution = p.float_solution(solution)
+
+    with timer.phase('production lines'):
+        production_lines = p.unordered_production_lines(solution)
+    calc_v2.assert_non_negative(production_lines)
+
+    with timer.phase('ordering'):
+        production_lines = calc_v2.order_production_lines(production_lines)
+
+    with timer.phase('printing'):
+        print_lines(production_lines)
+
+    return len(p.recipes), len(production_lines)
+
+
+def run(bench, repeat):
+    # returns (n_recipes, n_lines, {phase: (seconds, peak_bytes)}), with the fastest of repeat timed runs
+    seconds = {}
+    for _ in range(repeat):
+        timer = phase_timer()
+        bench(timer)
+        for name, t in timer.results.items():
+            seconds[name] = min(t, seconds.get(name, t))
+
+    timer = phase_timer(trace_memory = True)
+    n_recipes, n_lines = bench(timer)
+    return n_recipes, n_lines, {name: (t, timer.results[name]) for name, t in seconds.items()}
+
+
+def benchmarks(args):
+    # yields (program, recipe set, solver_backend, bench) for every benchmark selected by args
+    yield 'calc_v1', 'game', None, lambda timer: bench_v1(timer, calc_v1.ingredient(name = 'computer', number = 5))
+
+    for solver_backend in args.backends:
+        yield 'calc_v2', 'game', solver_backend, lambda timer, b=solver_backend: bench_v2(timer, b)
+
+    for n_recipes in args.sizes:
+        for solver_backend in args.backends:
+            # sympy does not scale to large systems, see planner
+            if solver_backend == 'sympy' and n_recipes > args.sympy_max_recipes:
+                continue
+            yield 'calc_v2', 'synthetic', solver_backend, lambda timer, b=solver_backend, n=n_recipes: bench_v2(timer, b, n, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Times each phase of calc_v1.py and calc_v2.py, on the game recipes, and on synthetic recipe graphs')
+    parser.add_argument('--sizes', type = int, nargs = '*', default = [100, 1000, 10000], help = 'synthetic recipe graph sizes, in recipes')
+    parser.add_argument('--backends', nargs = '+', default = ['sympy', 'exact', 'scipy'], choices = ['sympy', 'exact', 'scipy', 'linprog'], help = 'calc_v2 solver backends')
+    parser.add_argument('--sympy-max-recipes', type = int, default = 100, help = 'largest synthetic graph solved with sympy')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'timed runs of each benchmark, keeping the fastest')
+    parser.add_argument('--seed', type = int, default = 0, help = 'synthetic recipe graph seed')
+    parser.add_argument('--format', default = 'table', choices = ['table', 'jsonl'])
+    parser.add_argument('--output', help = 'output file, by default stdout')
+    args = parser.parse_args()
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    if args.format == 'table':
+        print(f'{"program":8} {"recipes":9} {"n":>6} {"backend":8} {"lines":>6} {"phase":17} {"seconds":>10} {"peak KiB":>10}', file = out)
+
+    for program, recipe_set, solver_backend, bench in benchmarks(args):
+        # a failed benchmark, like an infeasible linprog problem, is reported in place of its phases, and the run continues
+        try:
+            n_recipes, n_lines, phases = run(bench, args.repeat)
+        except AssertionError as e:
+            if args.format == 'table':
+                print(f'{program:8} {recipe_set:9} {"-":>6} {solver_backend or "-":8} {"-":>6} failed: {e}', file = out)
+            else:
+                print(json.dumps({'program': program, 'recipes': recipe_set, 'backend': solver_backend, 'error': str(e)}), file = out)
+            out.flush()
+            continue
+
+        for phase, (seconds, peak_bytes) in phases.items():
+            if args.format == 'table':
+                print(f'{program:8} {recipe_set:9} {n_recipes:6} {solver_backend or "-":8} {n_lines:6} {phase:17} {seconds:10.4f} {peak_bytes / 1024:10.1f}', file = out)
+            else:
+                print(json.dumps({'program': program, 'recipes': recipe_set, 'n_recipes': n_recipes, 'backend': solver_backend, 'lines': n_lines,
+                                  'phase': phase, 'seconds': seconds, 'peak_bytes': peak_bytes}), file = out)
+        out.flush()
+
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
 # imports
 import re
 from collections import defaultdict
+from functools import lru_cache
+
+import recipe_data
 
 
 # base classes
 class recipe():
+    __slots__ = ('inputs', 'outputs', 'rate', 'machine', 'primary_output')
+
     def __init__(self, inputs, outputs, rate, machine):
         self.inputs = inputs
         self.outputs = outputs
@@ -26,6 +31,8 @@ class recipe():
 
 
 class ingredient():
+    __slots__ = ('name', 'number', 'end_point', 'is_primary', 'sub_ingredients', 'is_waste')
+
     def __init__(self, name, number, end_point=False, is_primary=True, sub_ingredients=None, is_waste=False):
         self.name = name
         self.number = number
@@ -49,18 +56,18 @@ class ingredient():
 
 
 class production_line():
+    __slots__ = ('ing', 'recipe', 'num_machines', 'sort_key', 'excess_outputs')
+
     def __init__(self, ing):
         self.ing = ing.copy()
 
         if not self.ing.end_point:
-            self.recipe = recipes[self.ing.name]
+            self.recipe = load_recipes()[self.ing.name]
             self.num_machines = self.ing.number / self.recipe.rate
             self.sort_key = (machine_order.index(self.recipe.machine), -self.ing.number, self.ing.name)
 
-            self.excess_outputs = [ing.copy() for ing in self.recipe.outputs if not ing.is_primary]
             scale_factor = self.ing.number / self.recipe.primary_output.number
-            for ing in self.excess_outputs:
-                ing.number *= scale_factor
+            self.excess_outputs = [ingredient(ing.name, ing.number * scale_factor, is_primary = False) for ing in self.recipe.outputs if not ing.is_primary]
 
             add_sub_ingredients(self.ing, max_recursion_depth = 1)  # compute only the direct ingredients
 
@@ -92,240 +99,28 @@ class production_line():
         return s
 
 
-machine_order = ['smelter', 'foundry', 'refinery', 'constructor', 'assembler', 'manufacturer', 'packager']
-
-
-# recipes
-# comment out alternative recipies to remove pathways
-recipes = [
-    recipe(inputs =  [ingredient(name = 'iron ore',                number = 1, end_point=True)],
-           outputs = [ingredient(name = 'iron ingot',              number = 1)],
-           rate = 30, machine = 'smelter'),
-
-    # recipe(inputs =  [ingredient(name = 'copper ore',              number = 1, end_point=True)],
-    #        outputs = [ingredient(name = 'copper ingot',            number = 1)],
-    #        rate = 30, machine = 'smelter'),
-    recipe(inputs =  [ingredient(name = 'copper ore',              number = 6, end_point=True),
-                      ingredient(name = 'water',                   number = 4, end_point=True)],
-           outputs = [ingredient(name = 'copper ingot',            number = 15)],
-           rate = 37.5, machine = 'refinery'),
-
-    recipe(inputs =  [ingredient(name = 'caterium ore',            number = 3, end_point=True)],
-           outputs = [ingredient(name = 'caterium ingot',          number = 1)],
-           rate = 15, machine = 'smelter'),
-
-    recipe(inputs =  [ingredient(name = 'iron ore',                number = 3, end_point=True),
-                      ingredient(name = 'coal',                    number = 3, end_point=True)],
-           outputs = [ingredient(name = 'steel ingot',             number = 3)],
-           rate = 45, machine = 'foundry'),
-    # recipe(inputs =  [ingredient(name = 'iron ore',                number = 6, end_point=True),
-    #                   ingredient(name = 'compacted coal',          number = 3)],
-    #        outputs = [ingredient(name = 'steel ingot',             number = 10)],
-    #        rate = 37.5, machine = 'foundry'),
-
-    # recipe(inputs =  [ingredient(name = 'steel ingot',             number = 3),
-    #                   ingredient(name = 'plastic',                 number = 2)],
-    #        outputs = [ingredient(name = 'iron plate',              number = 18)],
-    #        rate = 45, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'iron ingot',              number = 3)],
-           outputs = [ingredient(name = 'iron plate',              number = 2)],
-           rate = 20, machine = 'constructor'),
-
-    recipe(inputs =  [ingredient(name = 'iron ingot',              number = 1)],
-           outputs = [ingredient(name = 'iron rod',                number = 1)],
-           rate = 15, machine = 'constructor'),
-
-    # recipe(inputs =  [ingredient(name = 'copper ingot',            number = 1)],
-    #        outputs = [ingredient(name = 'wire',                    number = 2)],
-    #        rate = 30, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'iron ingot',              number = 5)],
-           outputs = [ingredient(name = 'wire',                    number = 9)],
-           rate = 22.5, machine = 'constructor'),
-
-    recipe(inputs =  [ingredient(name = 'wire',                    number = 2)],
-           outputs = [ingredient(name = 'cable',                   number = 1)],
-           rate = 30, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'limestone',               number = 3, end_point=True)],
-           outputs = [ingredient(name = 'concrete',                number = 1)],
-           rate = 15, machine = 'constructor'),
-
-    # recipe(inputs =  [ingredient(name = 'iron rod',                number = 1)],
-    #        outputs = [ingredient(name = 'screw',                   number = 4)],
-    #        rate = 40, machine = 'constructor'),
-    # recipe(inputs =  [ingredient(name = 'iron ingot',              number = 5)],
-    #        outputs = [ingredient(name = 'screw',                   number = 20)],
-    #        rate = 50, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'steel beam',              number = 1)],
-           outputs = [ingredient(name = 'screw',                   number = 52)],
-           rate = 260, machine = 'constructor'),
-
-    # recipe(inputs =  [ingredient(name = 'iron plate',              number = 6),
-    #                   ingredient(name = 'screw',                   number = 12)],
-    #        outputs = [ingredient(name = 'reinforced iron plate',   number = 1)],
-    #        rate = 5, machine = 'assembler'),
-    # recipe(inputs =  [ingredient(name = 'iron plate',              number = 3),
-    #                   ingredient(name = 'rubber',                  number = 1)],
-    #        outputs = [ingredient(name = 'reinforced iron plate',   number = 1)],
-    #        rate = 3.75, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'iron plate',              number = 10),
-                      ingredient(name = 'wire',                    number = 20)],
-           outputs = [ingredient(name = 'reinforced iron plate',   number = 3)],
-           rate = 5.625, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'copper ingot',            number = 2)],
-           outputs = [ingredient(name = 'copper sheet',            number = 1)],
-           rate = 10, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'iron rod',                number = 5),
-                      ingredient(name = 'screw',                   number = 25)],
-           outputs = [ingredient(name = 'rotor',                   number = 1)],
-           rate = 4, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'reinforced iron plate',   number = 3),
-                      ingredient(name = 'iron rod',                number = 12)],
-           outputs = [ingredient(name = 'modular frame',           number = 2)],
-           rate = 2, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'reinforced iron plate',   number = 1),
-                      ingredient(name = 'rotor',                   number = 1)],
-           outputs = [ingredient(name = 'smart plating',           number = 1)],
-           rate = 2, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'quartz',                  number = 5, end_point=True)],
-           outputs = [ingredient(name = 'quartz crystal',          number = 3)],
-           rate = 22.5, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'quartz',                  number = 3, end_point=True)],
-           outputs = [ingredient(name = 'silica',                  number = 5)],
-           rate = 37.5, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'coal',                    number = 1, end_point=True),
-                      ingredient(name = 'sulfur',                  number = 1, end_point=True)],
-           outputs = [ingredient(name = 'black powder',            number = 2)],
-           rate = 30, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'steel ingot',             number = 4)],
-           outputs = [ingredient(name = 'steel beam',              number = 1)],
-           rate = 15, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'steel ingot',             number = 3)],
-           outputs = [ingredient(name = 'steel pipe',              number = 2)],
-           rate = 20, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'modular frame',           number = 1),
-                      ingredient(name = 'steel beam',              number = 12)],
-           outputs = [ingredient(name = 'versatile framework',     number = 2)],
-           rate = 5, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'steel beam',              number = 4),
-                      ingredient(name = 'concrete',                number = 5)],
-           outputs = [ingredient(name = 'encased industrial beam', number = 1)],
-           rate = 6, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'steel pipe',              number = 7),
-                      ingredient(name = 'concrete',                number = 5)],
-           outputs = [ingredient(name = 'encased industrial beam', number = 1)],
-           rate = 4, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'steel pipe',              number = 3),
-                      ingredient(name = 'wire',                    number = 8)],
-           outputs = [ingredient(name = 'stator',                  number = 1)],
-           rate = 5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'rotor',                   number = 2),
-                      ingredient(name = 'stator',                  number = 2)],
-           outputs = [ingredient(name = 'motor',                   number = 1)],
-           rate = 5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'stator',                  number = 1),
-                      ingredient(name = 'cable',                   number = 20)],
-           outputs = [ingredient(name = 'automated wiring',        number = 1)],
-           rate = 2.5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'modular frame',           number = 5),
-                      ingredient(name = 'steel pipe',              number = 15),
-                      ingredient(name = 'encased industrial beam', number = 5),
-                      ingredient(name = 'screw',                   number = 100)],
-           outputs = [ingredient(name = 'heavy modular frame',     number = 1)],
-           rate = 2, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'coal',                    number = 5, end_point = True),
-                      ingredient(name = 'sulfur',                  number = 5, end_point = True)],
-           outputs = [ingredient(name = 'compacted coal',          number = 5)],
-           rate = 25, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'oil',                     number = 3, end_point = True)],
-           outputs = [ingredient(name = 'plastic',                 number = 2),
-                      ingredient(name = 'heavy oil residue',       number = 1, is_primary = False)],
-           rate = 20, machine = 'refinery'),
-    # recipe(inputs =  [ingredient(name = 'polymer resin',           number = 6),
-    #                   ingredient(name = 'water',                   number = 2, end_point=True)],
-    #        outputs = [ingredient(name = 'plastic',                 number = 2)],
-    #        rate = 20, machine = 'refinery'),
-
-    recipe(inputs =  [ingredient(name = 'oil',                     number = 3, end_point = True)],
-           outputs = [ingredient(name = 'rubber',                  number = 2),
-                      ingredient(name = 'heavy oil residue',       number = 2, is_primary = False)],
-           rate = 20, machine = 'refinery'),
-    # recipe(inputs =  [ingredient(name = 'polymer resin',           number = 4),
-    #                   ingredient(name = 'water',                   number = 4, end_point=True)],
-    #        outputs = [ingredient(name = 'rubber',                  number = 2)],
-    #        rate = 20, machine = 'refinery'),
-
-    recipe(inputs =  [ingredient(name = 'oil',                     number = 6, end_point = True)],
-           outputs = [ingredient(name = 'fuel',                    number = 4),
-                      ingredient(name = 'polymer resin',           number = 3, is_primary = False)],
-           rate = 40, machine = 'refinery'),
-    # recipe(inputs =  [ingredient(name = 'heavy oil residue',       number = 6)],
-    #        outputs = [ingredient(name = 'fuel',                    number = 4)],
-    #        rate = 40, machine = 'refinery'),
-
-    recipe(inputs =  [ingredient(name = 'fuel',                    number = 6),
-                      ingredient(name = 'compacted coal',          number = 4)],
-           outputs = [ingredient(name = 'turbofuel',               number = 5)],
-           rate = 18.75, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'heavy oil residue',       number = 4)],  # TODO no primary recipe for this input
-           outputs = [ingredient(name = 'petroleum coke',          number = 12)],
-           rate = 120, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'copper sheet',            number = 2),
-                      ingredient(name = 'plastic',                 number = 4)],
-           outputs = [ingredient(name = 'circuit board',           number = 1)],
-           rate = 7.5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'caterium ingot',          number = 1)],
-           outputs = [ingredient(name = 'quickwire',               number = 5)],
-           rate = 60, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'copper sheet',            number = 5),
-                      ingredient(name = 'quickwire',               number = 20)],
-           outputs = [ingredient(name = 'ai limiter',              number = 1)],
-           rate = 5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'quarts crystal',          number = 36),
-                      ingredient(name = 'cable',                   number = 28),
-                      ingredient(name = 'reinforced iron plate',   number = 5)],
-           outputs = [ingredient(name = 'crystal oscillator',      number = 2)],
-           rate = 1, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'circuit board',           number = 10),
-                      ingredient(name = 'cable',                   number = 9),
-                      ingredient(name = 'plastic',                 number = 18),
-                      ingredient(name = 'screw',                   number = 52)],
-           outputs = [ingredient(name = 'computer',                number = 1)],
-           rate = 2.5, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'motor',                   number = 2),
-                      ingredient(name = 'rubber',                  number = 15),
-                      ingredient(name = 'smart plating',           number = 2)],
-           outputs = [ingredient(name = 'modular engine',          number = 1)],
-           rate = 1, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'automated wiring',        number = 15),
-                      ingredient(name = 'circuit board',           number = 10),
-                      ingredient(name = 'heavy modular frame',     number = 2),
-                      ingredient(name = 'computer',                number = 2)],
-           outputs = [ingredient(name = 'adaptive control unit',   number = 2)],
-           rate = 1, machine = 'manufacturer'),
-
-    recipe(inputs =  [ingredient(name = 'bauxite',                 number = 12, end_point = True),
-                      ingredient(name = 'water',                   number = 18, end_point = True)],
-           outputs = [ingredient(name = 'alumina solution',        number = 12),
-                      ingredient(name = 'silica',                  number = 5, is_primary = False)],
-           rate = 120, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'alumina solution',        number = 4),
-                      ingredient(name = 'coal',                    number = 2, end_point = True)],
-           outputs = [ingredient(name = 'aliminum scrap',          number = 6),
-                      ingredient(name = 'water',                   number = 2, is_primary = False)],
-           rate = 360, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'aliminum scrap',          number = 6),
-                      ingredient(name = 'silica',                  number = 5)],
-           outputs = [ingredient(name = 'aluminum ingot',          number = 4)],
-           rate = 60, machine = 'foundry'),
-]
-
-
-# data transformations
-recipes = {r.primary_output.name : r for r in recipes}
+machine_order = [name for name, _ in recipe_data.load().machines]
+
+
+@lru_cache(maxsize=None)
+def load_recipes():
+    # returns the recipe database, as a dict {primary output name: recipe}
+    #   read from recipes.json, with the recipes of its calc_v1 profile, see recipe_data.py
+    #   built on first use, and cached
+    database = recipe_data.load()
+    recipes, _ = database.profile_recipes('calc_v1')
+    recipes = [recipe(inputs =  [ingredient(name = name, number = number, end_point = name in database.raw_inputs) for name, number in r.inputs],
+                      outputs = [ingredient(name = name, number = number) for name, number in r.outputs] +
+                                [ingredient(name = name, number = number, is_primary = False) for name, number in r.byproducts],
+                      rate = r.rate, machine = r.machine)
+               for r in recipes]
+
+    # data transformations
+    #   recipes are keyed by primary output, so a profile enabling an alternate must also disable the active recipe
+    primary_outputs = [r.primary_output.name for r in recipes]
+    duplicates = sorted({name for name in primary_outputs if primary_outputs.count(name) > 1})
+    assert not duplicates, f'Did not produce a valid output. Multiple recipes for the same primary output, {duplicates}'
+    return {r.primary_output.name : r for r in recipes}
 
 
 def add_sub_ingredients(ing, max_recursion_depth = float('inf')):
@@ -336,7 +131,7 @@ def add_sub_ingredients(ing, max_recursion_depth = float('inf')):
 
     if not ing.end_point and max_recursion_depth > 0:
         # extract and scale target recipe
-        r = recipes[ing.name].copy()
+        r = load_recipes()[ing.name].copy()
         scale_factor = ing.number / r.primary_output.number
 
         for sub_ingredient in r.inputs:
@@ -345,25 +140,47 @@ def add_sub_ingredients(ing, max_recursion_depth = float('inf')):
             ing.sub_ingredients.append(sub_ingredient)
 
 
+@lru_cache(maxsize=None)
+def unit_requirements(name):
+    # returns dict {name: (number, end_point)} of every ingredient consumed, recursively, to produce one unit of the named ingredient
+    #   including the named ingredient itself, with number 1
+    # memoized, so each ingredient is expanded once, in dependency order, and reused by every recipe depending on it
+    #   so expansion costs are linear in the number of recipes, rather than in the size of the product tree
+    # do not modify the returned dict, it is shared by all callers
+
+    r = load_recipes()[name]
+    scale_factor = 1 / r.primary_output.number
+
+    requirements = {name: (1, False)}
+    for sub_ingredient in r.inputs:
+        if sub_ingredient.end_point:
+            sub_requirements = {sub_ingredient.name: (1, True)}
+        else:
+            sub_requirements = unit_requirements(sub_ingredient.name)
+
+        for sub_name, (number, end_point) in sub_requirements.items():
+            number *= sub_ingredient.number * scale_factor
+            if sub_name in requirements:
+                number += requirements[sub_name][0]
+            requirements[sub_name] = (number, end_point)
+
+    return requirements
+
+
 def consolidate_production_steps(ing):
-    # execute after add_sub_ingredients function
-    # returns dict {name: ingredient}, for each ingredient recursively consolidated from the sub_ingredients attribute of ing
+    # returns dict {name: ingredient}, for each ingredient recursively required to produce ing
     #   adds ingredient numbers
-    #   sets sub_ingredients attributes to None 
-
-    steps = {ing.name : ing.copy()}
-    steps[ing.name].sub_ingredients = None  # wipe sub_ingredients from consolidated list
+    #   sets sub_ingredients attributes to None
+    # scales the memoized unit_requirements of ing, so does not need the product tree from add_sub_ingredients
 
-    if not ing.end_point:
-        for sub_ingredient in ing.sub_ingredients:
-            sub_steps = consolidate_production_steps(sub_ingredient)
+    if ing.end_point:
+        steps = {ing.name : ing.copy()}
+        steps[ing.name].sub_ingredients = None  # wipe sub_ingredients from consolidated list
+        return steps
 
-            for name, sub_ingredient in sub_steps.items():
-                if name not in steps:
-                    steps[name] = sub_ingredient.copy()
-                    steps[name].sub_ingredients = None  # wipe sub_ingredients from consolidated list
-                else:
-                    steps[name].number += sub_ingredient.number
+    steps = {}
+    for name, (number, end_point) in unit_requirements(ing.name).items():
+        steps[name] = ingredient(name = name, number = number * ing.number, end_point = end_point)
 
     return steps
 
@@ -408,36 +225,38 @@ def balance_io(production_lines):
 
 
 
-# target specific product
-# target = ingredient(name = 'computer', number = 5)
-# target = ingredient(name = 'modular engine', number = 500 / 120)
-# target = ingredient(name = 'adaptive control unit', number = 1)
-# target = ingredient(name = 'turbofuel', number = 4.5*20)
-target = ingredient(name = 'aluminum ingot', number = 100)
+def main():
+    # target specific product
+    # target = ingredient(name = 'computer', number = 5)
+    # target = ingredient(name = 'modular engine', number = 500 / 120)
+    # target = ingredient(name = 'adaptive control unit', number = 1)
+    # target = ingredient(name = 'turbofuel', number = 4.5*20)
+    target = ingredient(name = 'aluminum ingot', number = 100)
 
-# construct product tree
-add_sub_ingredients(target)
+    # consolidate production steps
+    steps = consolidate_production_steps(target)
 
-# consolidate production steps
-steps = consolidate_production_steps(target)
+    # order steps, and outfit with additional information
+    production_lines = [production_line(v) for k,v in steps.items()]
+    # production_lines = balance_io(production_lines)  # TODO
+    production_lines.sort(key=lambda x: x.sort_key)
 
-# order steps, and outfit with additional information
-production_lines = [production_line(v) for k,v in steps.items()]
-# production_lines = balance_io(production_lines)  # TODO
-production_lines.sort(key=lambda x: x.sort_key)
+    # print formatted full tree
+    # print('Product Tree')
+    # add_sub_ingredients(target)
+    # def pretty_print(ing, depth = 0):
+    #     print("    " * depth + f'{ing.name} x {ing.number}')
+    #     if not ing.end_point:
+    #         for sub_ingredient in ing.sub_ingredients:
+    #             pretty_print(sub_ingredient, depth = depth + 1)
+    # pretty_print(target)
+    # print()
 
-# print formatted full tree
-# print('Product Tree')
-# def pretty_print(ing, depth = 0):
-#     print("    " * depth + f'{ing.name} x {ing.number}')
-#     if not ing.end_point:
-#         for sub_ingredient in ing.sub_ingredients:
-#             pretty_print(sub_ingredient, depth = depth + 1)
-# pretty_print(target)
-# print()
+    # print production lines
+    print(f'Production Lines ({len(production_lines)})')
+    for line in production_lines:
+        print(str(line))
 
-# print production lines
-print(f'Production Lines ({len(production_lines)})')
-for line in production_lines:
-    print(str(line))
 
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,33 @@
 # imports
+import argparse
+import contextlib
+import hashlib
+import heapq
+import json
 import math
+import os
 import re
-import pprint
-import sympy
-from collections import namedtuple
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, defaultdict, namedtuple
+from fractions import Fraction
+from functools import cached_property, lru_cache, wraps
+
+import recipe_data
 
 
 # base classes
+# recipes and ingredients are immutable once constructed, so they are shared rather than copied, by recipes, targets and production lines
 class recipe():
+    __slots__ = ('inputs', 'outputs', 'rate', 'machine', 'primary_output', 'name')
+
     def __init__(self, inputs, outputs, rate, machine, name=None):
-        self.inputs = inputs
-        self.outputs = outputs
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
         self.rate = rate
         self.machine = machine
-        assert machine in machine_order, machine
+        assert machine in machine_rank, machine
 
         # set this recipe's primary_output. Check that only one such output exists
         self.primary_output = None
@@ -28,62 +42,99 @@ class recipe():
         self.name = name or self.primary_output.name
 
     def copy(self):
-        return recipe([x.copy() for x in self.inputs], [x.copy() for x in self.outputs], self.rate, self.machine, self.name)
+        return recipe(self.inputs, self.outputs, self.rate, self.machine, self.name)
 
     def __str__(self):
         return f'inputs: {[str(x) for x in self.inputs]}, outputs: {[str(x) for x in self.outputs]}, rate: {self.rate}, machine: {self.machine}, primary_output: {self.primary_output}'
 
 
-all_ingredients = set()
-class ingredient():
-    def __init__(self, name, number, is_primary=True):
-        self.name = name
-        self.number = number
-        self.is_primary = is_primary  # only relevant for recipe outputs
-
-        # update global list of all ingredient names
-        all_ingredients.add(self.name)
+class ingredient(namedtuple('ingredient', ['name', 'number', 'is_primary'], defaults=[True])):
+    # a tuple, so ingredients are compact, and immutable
+    #   is_primary is only relevant for recipe outputs
+    __slots__ = ()
 
     def copy(self):
-        return ingredient(self.name, self.number, self.is_primary)
+        return self
 
     def __str__(self):
         return f'Ingredient: {self.number} x {self.name}, is_primary: {self.is_primary}'
 
 
 class production_line():
-    def __init__(self, ing):
-        self.ing = ing.copy()
-
-        if not self.ing.name in raw_inputs:
-            self.recipe = recipes[self.ing.name]
-            self.num_machines = self.ing.number / self.recipe.rate
-            self.sort_key = (machine_order.index(self.recipe.machine), self.ing.name)
-
-            scale_factor = self.ing.number
+    # the production line of one planner variable, i_var, a recipe or raw input run to produce number of its primary output, or a sink disposing of number of its ingredient
+    #   ingredients are held by their row in the planner's recipe_matrix, and only named for output, by inputs and excess_outputs
+    __slots__ = ('recipe_matrix', 'i_var', 'ing', 'is_raw_input', 'is_waste', 'output_row', 'output_name', 'recipe', 'num_machines', 'sort_key',
+                 'input_rows', 'input_numbers', 'excess_rows', 'excess_numbers')
+
+    def __init__(self, i_var, number, planner):
+        recipe_matrix = self.recipe_matrix = planner.recipe_matrix
+        self.i_var = i_var
+        self.ing = ingredient(recipe_matrix.variables[i_var], number)
+        self.is_waste = i_var >= len(recipe_matrix.variables) - recipe_matrix.n_sinks
+        self.is_raw_input = recipe_matrix.n_recipes <= i_var and not self.is_waste
+
+        # the produced ingredient, which differs from ing.name for named recipes, like alternates
+        #   recipes without a primary output, like power generation, have no output_row
+        self.output_row = recipe_matrix.primary_rows[i_var]
+        self.output_name = self.ing.name if self.output_row is None else recipe_matrix.ingredients[self.output_row]
+
+        if self.is_waste:
+            # sinks have the single input of their disposed ingredient
+            self.sort_key = (len(machine_order), self.ing.name)
+            (i_ing, _), = recipe_matrix.columns[i_var]
+            self.input_rows, self.input_numbers, self.excess_rows, self.excess_numbers = (i_ing,), (number,), (), ()
+            self.output_name = recipe_matrix.ingredients[i_ing]
+
+        elif not self.is_raw_input:
+            self.recipe = planner.recipes[self.ing.name]
+            self.num_machines = number / self.recipe.rate
+            self.sort_key = (machine_rank[self.recipe.machine], self.ing.name)
+
+            scale_factor = number
             if self.recipe.primary_output is not None:
                 scale_factor /= self.recipe.primary_output.number
 
-            self.inputs = [ing.copy() for ing in self.recipe.inputs]
-            for ing in self.inputs:
-                ing.number *= scale_factor
-
-            self.excess_outputs = [ing.copy() for ing in self.recipe.outputs if not ing.is_primary]
-            for ing in self.excess_outputs:
-                ing.number *= scale_factor
+            # scale the recipe's inputs and excess outputs, split from its column of the compiled recipe matrix once per planner
+            self.input_rows, input_numbers, self.excess_rows, excess_numbers = planner.line_terms[i_var]
+            self.input_numbers = [number * scale_factor for number in input_numbers]
+            self.excess_numbers = [number * scale_factor for number in excess_numbers]
 
         else:
             self.sort_key = (-1, self.ing.name)
+            self.input_rows, self.input_numbers, self.excess_rows, self.excess_numbers = (), (), (), ()
+
+    @property
+    def inputs(self):
+        return [ingredient(self.recipe_matrix.ingredients[i_ing], number) for i_ing, number in zip(self.input_rows, self.input_numbers)]
+
+    @property
+    def excess_outputs(self):
+        return [ingredient(self.recipe_matrix.ingredients[i_ing], number, False) for i_ing, number in zip(self.excess_rows, self.excess_numbers)]
+
+    def as_dict(self):
+        # the fields of __str__, as plain data, for structured output and for passing plans between processes
+        d = {'kind': 'raw input' if self.is_raw_input else 'waste' if self.is_waste else 'line', 'name': self.output_name, 'number': self.ing.number}
+        if not self.is_raw_input and not self.is_waste:
+            d['recipe'] = self.ing.name
+            d['machine'] = self.recipe.machine
+            d['machines'] = self.num_machines
+            d['recycle'] = {ing.name: ing.number for ing in self.excess_outputs}
+            d['inputs'] = {ing.name: ing.number for ing in self.inputs}
+        return d
 
     def __str__(self):
-        if self.ing.name in raw_inputs:
+        if self.is_raw_input:
             s = 'Raw Input: '
+        elif self.is_waste:
+            s = 'Waste: '
         else:
             s = 'Line: '
 
-        s += f'{self.ing.number:.2f} x {self.ing.name}'
+        s += f'{self.ing.number:.2f} x {self.output_name}'
         
-        if not self.ing.name in raw_inputs:
+        if not self.is_raw_input and not self.is_waste:
+            if self.output_name != self.ing.name:
+                s += f' [{self.ing.name}]'
             s += f' ({self.num_machines:.2f} x {self.recipe.machine})'
             for ing in self.excess_outputs:
                 s += f'\n    Recycle: {ing.number:.2f} x {ing.name}'
@@ -93,363 +144,126 @@ class production_line():
         return s
 
 
-machine_order = ['smelter', 'foundry', 'refinery', 'blender', 'fuel generator', 'constructor', 'assembler', 'manufacturer', 'packager']
-
-
-# recipes
-# comment out alternative recipies to remove pathways
-recipes = [
-    recipe(inputs =  [ingredient(name = 'iron ore',                number = 1)],
-           outputs = [ingredient(name = 'iron ingot',              number = 1)],
-           rate = 30, machine = 'smelter'),
-
-    # recipe(inputs =  [ingredient(name = 'copper ore',              number = 1)],
-    #        outputs = [ingredient(name = 'copper ingot',            number = 1)],
-    #        rate = 30, machine = 'smelter'),
-    recipe(inputs =  [ingredient(name = 'copper ore',              number = 6),
-                      ingredient(name = 'water',                   number = 4)],
-           outputs = [ingredient(name = 'copper ingot',            number = 15)],
-           rate = 37.5, machine = 'refinery'),
-
-    recipe(inputs =  [ingredient(name = 'caterium ore',            number = 3)],
-           outputs = [ingredient(name = 'caterium ingot',          number = 1)],
-           rate = 15, machine = 'smelter'),
-
-    recipe(inputs =  [ingredient(name = 'iron ore',                number = 3),
-                      ingredient(name = 'coal',                    number = 3)],
-           outputs = [ingredient(name = 'steel ingot',             number = 3)],
-           rate = 45, machine = 'foundry'),
-    # recipe(inputs =  [ingredient(name = 'iron ore',                number = 6),
-    #                   ingredient(name = 'compacted coal',          number = 3)],
-    #        outputs = [ingredient(name = 'steel ingot',             number = 10)],
-    #        rate = 37.5, machine = 'foundry'),
-
-    # recipe(inputs =  [ingredient(name = 'steel ingot',             number = 3),
-    #                   ingredient(name = 'plastic',                 number = 2)],
-    #        outputs = [ingredient(name = 'iron plate',              number = 18)],
-    #        rate = 45, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'iron ingot',              number = 3)],
-           outputs = [ingredient(name = 'iron plate',              number = 2)],
-           rate = 20, machine = 'constructor'),
-
-    recipe(inputs =  [ingredient(name = 'iron ingot',              number = 1)],
-           outputs = [ingredient(name = 'iron rod',                number = 1)],
-           rate = 15, machine = 'constructor'),
-
-    recipe(inputs =  [ingredient(name = 'copper ingot',            number = 1)],
-           outputs = [ingredient(name = 'wire',                    number = 2)],
-           rate = 30, machine = 'constructor'),
-    # recipe(inputs =  [ingredient(name = 'iron ingot',              number = 5)],
-    #        outputs = [ingredient(name = 'wire',                    number = 9)],
-    #        rate = 22.5, machine = 'constructor'),
-    # recipe(inputs =  [ingredient(name = 'copper ingot',            number = 4),
-    #                   ingredient(name = 'caterium ingot',          number = 1)],
-    #        outputs = [ingredient(name = 'wire',                    number = 30)],
-    #        rate = 90, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'wire',                    number = 2)],
-           outputs = [ingredient(name = 'cable',                   number = 1)],
-           rate = 30, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'limestone',               number = 3)],
-           outputs = [ingredient(name = 'concrete',                number = 1)],
-           rate = 15, machine = 'constructor'),
-
-    # recipe(inputs =  [ingredient(name = 'iron rod',                number = 1)],
-    #        outputs = [ingredient(name = 'screw',                   number = 4)],
-    #        rate = 40, machine = 'constructor'),
-    # recipe(inputs =  [ingredient(name = 'iron ingot',              number = 5)],
-    #        outputs = [ingredient(name = 'screw',                   number = 20)],
-    #        rate = 50, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'steel beam',              number = 1)],
-           outputs = [ingredient(name = 'screw',                   number = 52)],
-           rate = 260, machine = 'constructor'),
-
-    # recipe(inputs =  [ingredient(name = 'iron plate',              number = 6),
-    #                   ingredient(name = 'screw',                   number = 12)],
-    #        outputs = [ingredient(name = 'reinforced iron plate',   number = 1)],
-    #        rate = 5, machine = 'assembler'),
-    # recipe(inputs =  [ingredient(name = 'iron plate',              number = 3),
-    #                   ingredient(name = 'rubber',                  number = 1)],
-    #        outputs = [ingredient(name = 'reinforced iron plate',   number = 1)],
-    #        rate = 3.75, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'iron plate',              number = 10),
-                      ingredient(name = 'wire',                    number = 20)],
-           outputs = [ingredient(name = 'reinforced iron plate',   number = 3)],
-           rate = 5.625, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'copper ingot',            number = 2)],
-           outputs = [ingredient(name = 'copper sheet',            number = 1)],
-           rate = 10, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'iron rod',                number = 5),
-                      ingredient(name = 'screw',                   number = 25)],
-           outputs = [ingredient(name = 'rotor',                   number = 1)],
-           rate = 4, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'reinforced iron plate',   number = 3),
-                      ingredient(name = 'iron rod',                number = 12)],
-           outputs = [ingredient(name = 'modular frame',           number = 2)],
-           rate = 2, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'reinforced iron plate',   number = 1),
-                      ingredient(name = 'rotor',                   number = 1)],
-           outputs = [ingredient(name = 'smart plating',           number = 1)],
-           rate = 2, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'quartz',                  number = 5)],
-           outputs = [ingredient(name = 'quartz crystal',          number = 3)],
-           rate = 22.5, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'quartz',                  number = 3)],
-           outputs = [ingredient(name = 'silica',                  number = 5)],
-           rate = 37.5, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'coal',                    number = 1),
-                      ingredient(name = 'sulfur',                  number = 1)],
-           outputs = [ingredient(name = 'black powder',            number = 2)],
-           rate = 30, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'steel ingot',             number = 4)],
-           outputs = [ingredient(name = 'steel beam',              number = 1)],
-           rate = 15, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'steel ingot',             number = 3)],
-           outputs = [ingredient(name = 'steel pipe',              number = 2)],
-           rate = 20, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'modular frame',           number = 1),
-                      ingredient(name = 'steel beam',              number = 12)],
-           outputs = [ingredient(name = 'versatile framework',     number = 2)],
-           rate = 5, machine = 'assembler'),
-
-    # recipe(inputs =  [ingredient(name = 'steel beam',              number = 4),
-    #                   ingredient(name = 'concrete',                number = 5)],
-    #        outputs = [ingredient(name = 'encased industrial beam', number = 1)],
-    #        rate = 6, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'steel pipe',              number = 7),
-                      ingredient(name = 'concrete',                number = 5)],
-           outputs = [ingredient(name = 'encased industrial beam', number = 1)],
-           rate = 4, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'steel pipe',              number = 3),
-                      ingredient(name = 'wire',                    number = 8)],
-           outputs = [ingredient(name = 'stator',                  number = 1)],
-           rate = 5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'rotor',                   number = 2),
-                      ingredient(name = 'stator',                  number = 2)],
-           outputs = [ingredient(name = 'motor',                   number = 1)],
-           rate = 5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'stator',                  number = 1),
-                      ingredient(name = 'cable',                   number = 20)],
-           outputs = [ingredient(name = 'automated wiring',        number = 1)],
-           rate = 2.5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'modular frame',           number = 5),
-                      ingredient(name = 'steel pipe',              number = 15),
-                      ingredient(name = 'encased industrial beam', number = 5),
-                      ingredient(name = 'screw',                   number = 100)],
-           outputs = [ingredient(name = 'heavy modular frame',     number = 1)],
-           rate = 2, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'coal',                    number = 5),
-                      ingredient(name = 'sulfur',                  number = 5)],
-           outputs = [ingredient(name = 'compacted coal',          number = 5)],
-           rate = 25, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'oil',                     number = 3)],
-           outputs = [ingredient(name = 'plastic',                 number = 2),
-                      ingredient(name = 'heavy oil residue',       number = 1, is_primary = False)],
-           rate = 20, machine = 'refinery'),
-    # recipe(inputs =  [ingredient(name = 'polymer resin',           number = 6),
-    #                   ingredient(name = 'water',                   number = 2)],
-    #        outputs = [ingredient(name = 'plastic',                 number = 2)],
-    #        rate = 20, machine = 'refinery'),
-
-    recipe(inputs =  [ingredient(name = 'oil',                     number = 3)],
-           outputs = [ingredient(name = 'rubber',                  number = 2),
-                      ingredient(name = 'heavy oil residue',       number = 2, is_primary = False)],
-           rate = 20, machine = 'refinery'),
-    # recipe(inputs =  [ingredient(name = 'polymer resin',           number = 4),
-    #                   ingredient(name = 'water',                   number = 4)],
-    #        outputs = [ingredient(name = 'rubber',                  number = 2)],
-    #        rate = 20, machine = 'refinery'),
-
-    # recipe(inputs =  [ingredient(name = 'oil',                     number = 6)],
-    #        outputs = [ingredient(name = 'fuel',                    number = 4),
-    #                   ingredient(name = 'polymer resin',           number = 3, is_primary = False)],
-    #        rate = 40, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'heavy oil residue',       number = 6)],
-           outputs = [ingredient(name = 'fuel',                    number = 4)],
-           rate = 40, machine = 'refinery'),
-
-    recipe(inputs =  [ingredient(name = 'fuel',                    number = 1)],
-           outputs = [], name='power generation fuel',
-           rate = 12, machine = 'fuel generator'),
-    # recipe(inputs =  [ingredient(name = 'turbofuel',               number = 1)],
-    #        outputs = [], name='power generation turbofuel',
-    #        rate = 4.5, machine = 'fuel generator'),
-
-    recipe(inputs =  [ingredient(name = 'fuel',                    number = 6),
-                      ingredient(name = 'compacted coal',          number = 4)],
-           outputs = [ingredient(name = 'turbofuel',               number = 5)],
-           rate = 18.75, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'heavy oil residue',       number = 4)],  # TODO no primary recipe for this input
-           outputs = [ingredient(name = 'petroleum coke',          number = 12)],
-           rate = 120, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'copper sheet',            number = 2),
-                      ingredient(name = 'plastic',                 number = 4)],
-           outputs = [ingredient(name = 'circuit board',           number = 1)],
-           rate = 7.5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'caterium ingot',          number = 1)],
-           outputs = [ingredient(name = 'quickwire',               number = 5)],
-           rate = 60, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'copper sheet',            number = 5),
-                      ingredient(name = 'quickwire',               number = 20)],
-           outputs = [ingredient(name = 'ai limiter',              number = 1)],
-           rate = 5, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'quartz crystal',          number = 36),
-                      ingredient(name = 'cable',                   number = 28),
-                      ingredient(name = 'reinforced iron plate',   number = 5)],
-           outputs = [ingredient(name = 'crystal oscillator',      number = 2)],
-           rate = 1, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'circuit board',           number = 10),
-                      ingredient(name = 'cable',                   number = 9),
-                      ingredient(name = 'plastic',                 number = 18),
-                      ingredient(name = 'screw',                   number = 52)],
-           outputs = [ingredient(name = 'computer',                number = 1)],
-           rate = 2.5, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'motor',                   number = 2),
-                      ingredient(name = 'rubber',                  number = 15),
-                      ingredient(name = 'smart plating',           number = 2)],
-           outputs = [ingredient(name = 'modular engine',          number = 1)],
-           rate = 1, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'automated wiring',        number = 15),
-                      ingredient(name = 'circuit board',           number = 10),
-                      ingredient(name = 'heavy modular frame',     number = 2),
-                      ingredient(name = 'computer',                number = 2)],
-           outputs = [ingredient(name = 'adaptive control unit',   number = 2)],
-           rate = 1, machine = 'manufacturer'),
-
-    recipe(inputs =  [ingredient(name = 'bauxite',                 number = 12),
-                      ingredient(name = 'water',                   number = 18)],
-           outputs = [ingredient(name = 'alumina solution',        number = 12),
-                      ingredient(name = 'silica',                  number = 5, is_primary = False)],
-           rate = 120, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'alumina solution',        number = 4),
-                      ingredient(name = 'coal',                    number = 2)],
-           outputs = [ingredient(name = 'aluminum scrap',          number = 6),
-                      ingredient(name = 'water',                   number = 2, is_primary = False)],
-           rate = 360, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'aluminum scrap',          number = 6),
-                      ingredient(name = 'silica',                  number = 5)],
-           outputs = [ingredient(name = 'aluminum ingot',          number = 4)],
-           rate = 60, machine = 'foundry'),
-    recipe(inputs =  [ingredient(name = 'aluminum ingot',          number = 3),
-                      ingredient(name = 'copper ingot',            number = 1)],
-           outputs = [ingredient(name = 'alclad aluminum sheet',   number = 3)],
-           rate = 30, machine = 'assembler'),
-    recipe(inputs =  [ingredient(name = 'aluminum ingot',          number = 3)],
-           outputs = [ingredient(name = 'aluminum casing',         number = 2)],
-           rate = 60, machine = 'constructor'),
-    recipe(inputs =  [ingredient(name = 'aluminum casing',         number = 32),
-                      ingredient(name = 'crystal oscillator',      number = 1),
-                      ingredient(name = 'computer',                number = 1)],
-           outputs = [ingredient(name = 'radio control unit',      number = 2)],
-           rate = 2.5, machine = 'manufacturer'),
-
-    recipe(inputs =  [ingredient(name = 'gas filter',              number = 1),
-                      ingredient(name = 'quickwire',               number = 5),
-                      ingredient(name = 'aluminum casing',         number = 1)],
-           outputs = [ingredient(name = 'iodine infused filter',   number = 1)],
-           rate = 3.75, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'coal',                    number = 5),
-                      ingredient(name = 'rubber',                  number = 2),
-                      ingredient(name = 'fabric',                  number = 2)],
-           outputs = [ingredient(name = 'gas filter',              number = 1)],
-           rate = 7.5, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'mycelia',                 number = 1),
-                      ingredient(name = 'biomass',                 number = 5)],
-           outputs = [ingredient(name = 'fabric',                  number = 1)],
-           rate = 15, machine = 'assembler'),
-
-    recipe(inputs =  [ingredient(name = 'sulfur',                  number = 5),
-                      ingredient(name = 'water',                   number = 5)],
-           outputs = [ingredient(name = 'sulfuric acid',           number = 5)],
-           rate = 50, machine = 'refinery'),
-    recipe(inputs =  [ingredient(name = 'sulfuric acid',           number = 2.5),
-                      ingredient(name = 'alumina solution',        number = 2),
-                      ingredient(name = 'aluminum casing',         number = 1)],
-           outputs = [ingredient(name = 'battery',                 number = 1),
-                      ingredient(name = 'water',                   number = 1.5, is_primary = False)],
-           rate = 20, machine = 'blender'),
-
-    recipe(inputs =  [ingredient(name = 'quickwire',               number = 56),
-                      ingredient(name = 'cable',                   number = 10),
-                      ingredient(name = 'circuit board',           number = 1)],
-           outputs = [ingredient(name = 'high speed connector',    number = 1)],
-           rate = 3.75, machine = 'manufacturer'),
-    recipe(inputs =  [ingredient(name = 'computer',                number = 2),
-                      ingredient(name = 'ai limiter',              number = 2),
-                      ingredient(name = 'high speed connector',    number = 3),
-                      ingredient(name = 'plastic',                 number = 28)],
-           outputs = [ingredient(name = 'supercomputer',           number = 1)],
-           rate = 1.875, machine = 'manufacturer'),
-
-    recipe(inputs =  [ingredient(name = 'adaptive control unit',    number = 2),
-                      ingredient(name = 'super computer',           number = 1)],
-           outputs = [ingredient(name = 'assembly director system', number = 1)],
-           rate = 0.75, machine = 'assembler'),
-
-    # TODO create resource sinks / waste disposal paths
-]
-
-raw_inputs = [
-    'bauxite',
-    'caterium ore',
-    'coal',
-    'copper ore',
-    'iron ore',
-    'limestone',
-    'oil',
-    'quartz',
-    'sulfur',
-    'water'
-]
-
-
-# data transformations
-
-# verify we don't lose any recipes in the transformation (invalid user configuration)
-l, names = len(recipes), [r.name for r in recipes]
-recipes = {r.name : r for r in recipes}
-assert l == len(recipes), f'Lost {l - len(recipes)} recipes! {sorted(names)}'
-
-
-
-
-# create symbolic variables
-Sym_Map = namedtuple('Sym_Map', ['recipes', 'raw_inputs'])
-
-sym_vars = Sym_Map({}, {})  # name to symbolic variable
-for name in raw_inputs:
-    sym_vars.raw_inputs[name] = sympy.symbols('i_' + re.sub(r'\s+', '_', name))
-for name in recipes:
-    sym_vars.recipes[name] = sympy.symbols('r_' + re.sub(r'\s+', '_', name))
-
-sym_names = Sym_Map({}, {})  # reverse lookup
-for k, v in sym_vars.raw_inputs.items():
-    sym_names.raw_inputs[v] = k
-for k, v in sym_vars.recipes.items():
-    sym_names.recipes[v] = k
-
-all_sym_vars = [v for k,v in sym_vars.recipes.items()] + [v for k,v in sym_vars.raw_inputs.items()]
-
-
-
-
-# target specific product
-# target = ingredient(name = 'computer', number = 5)
-# target = ingredient(name = 'modular engine', number = 500 / 120)
-# target = ingredient(name = 'adaptive control unit', number = 1)
-# target = ingredient(name = 'turbofuel', number = 4.5*20)
-# target = [ingredient(name = 'alclad aluminum sheet', number = sympy.Rational('100')),
-#           ingredient(name = 'aluminum casing', number = sympy.Rational('100')),
-#           ingredient(name = 'radio control unit', number = sympy.Rational('5')),
-#           ]
-target = [ingredient(name = 'supercomputer', number = sympy.Rational('1.875'))]
-
-target = {ing.name: ing for ing in target}
-
+# machines, in production line order, with their power consumption at 100% clock, in MW. Negative for generators
+Machine = namedtuple('Machine', ['name', 'power'])
+machine_table = [Machine(name, power) for name, power in recipe_data.load().machines]
+machine_order = [machine.name for machine in machine_table]
+machine_rank = {machine.name: i for i, machine in enumerate(machine_table)}
+machine_power = {machine.name: machine.power for machine in machine_table}
+
+# machines run at clock speeds from min_clock to max_clock, as fractions of their normal rate
+#   power consumption scales with clock ** overclock_exponent, generators' power output scales linearly
+min_clock = 0.01
+max_clock = 2.5
+overclock_exponent = math.log2(2.5)
+
+
+def load_recipes(path=None, profile=None):
+    # returns the recipe database, as tuples (recipes, alternate_recipes) of recipe objects
+    #   read from the data file at path, by default recipes.json, see recipe_data.py
+    #   recipes are those enabled by profile, or with no profile, by their enabled flags, and alternate_recipes the rest
+    # each primary output must have exactly one active recipe, for the linear system to have a unique solution
+    #   so switch pathways by toggling recipes in a profile, or their enabled flags
+    return build_recipes(recipe_data.load(path), profile)
+
+
+@lru_cache(maxsize=32)
+def build_recipes(database, profile=None):
+    # the recipe objects of database, cached per loaded database and profile
+    #   the machine table is loaded from the default data file, other data files must agree with it
+    for name, power in database.machines:
+        assert machine_power.get(name) == power, f'machine {name} of {database.path} differs from the machine table, {power} MW'
+
+    return tuple(tuple(recipe(inputs = [ingredient(name = name, number = number) for name, number in r.inputs],
+                              outputs = [ingredient(name = name, number = number) for name, number in r.outputs] +
+                                        [ingredient(name = name, number = number, is_primary = False) for name, number in r.byproducts],
+                              rate = r.rate, machine = r.machine, name = r.name)
+                       for r in recipes)
+                 for recipes in database.profile_recipes(profile))
+
+
+# raw inputs of the default data file
+raw_inputs = list(recipe_data.load().raw_inputs)
+
+
+# compile the recipe system into a sparse incidence structure (see the matrix description below)
+#   built once, in a single pass over each recipe's inputs and outputs, so each recipe costs work proportional to its own size
+#   variables are ordered as recipes, then raw_inputs, then sinks
+#   columns[i_var] lists (i_ingredient, number) entries, with inputs negative and outputs positive
+#   rows[i_ingredient] lists (i_var, number) entries, the transpose of columns
+#   primary_rows[i_var] is the i_ingredient of each recipe's primary output, or None
+#   each of the last n_sinks variables disposes of one ingredient, named sinks, with a column of -1 in its row, and no primary row
+# with power_balance, power (in MW) is compiled as one more ingredient, consumed by each recipe's machines, and produced by generators
+#   so solving balances the generators against the plan's own consumption, and a target number of power is a surplus to generate
+Recipe_Matrix = namedtuple('Recipe_Matrix', ['ingredients', 'ingredient_index', 'variables', 'variable_index', 'n_recipes', 'columns', 'rows', 'primary_rows', 'n_sinks'])
+
+power_ingredient = 'power'
+
+def recipe_power(r):
+    # power consumed by the machines running recipe r once per minute, in MW, as an exact fraction. Negative for generators
+    #   scaled as production_line scales num_machines, by the primary output number, if any
+    output_number = 1 if r.primary_output is None else r.primary_output.number
+    return Fraction(str(machine_power[r.machine])) * Fraction(str(output_number)) / Fraction(str(r.rate))
+
+
+def sink_name(name):
+    # variable name of the sink of an ingredient
+    return f'{name} sink'
+
+
+def byproduct_sinks(recipes, cost=0):
+    # returns dict {name: cost} of a sink for every by-product, a non primary output, of recipes, for planner sinks
+    return {ing.name: cost for r in recipes.values() for ing in r.outputs if not ing.is_primary}
+
+
+def compile_recipes(recipes, raw_inputs, power_balance=False, sinks=()):
+    ingredients, ingredient_index = [], {}
+    def index(name):
+        if name not in ingredient_index:
+            ingredient_index[name] = len(ingredients)
+            ingredients.append(name)
+        return ingredient_index[name]
+
+    variables, columns, primary_rows = [], [], []
+    for name, r in recipes.items():
+        variables.append(name)
+        columns.append([(index(ing.name), -ing.number) for ing in r.inputs] + [(index(ing.name), ing.number) for ing in r.outputs])
+        if power_balance and machine_power[r.machine]:
+            columns[-1].append((index(power_ingredient), -recipe_power(r)))
+        primary_rows.append(None if r.primary_output is None else index(r.primary_output.name))
+
+    for name in raw_inputs:
+        variables.append(name)
+        columns.append([(index(name), 1)])
+        primary_rows.append(index(name))
+
+    for name in sinks:
+        assert name in ingredient_index, f'No recipe uses or produces sink, {name}'
+        variables.append(sink_name(name))
+        columns.append([(index(name), -1)])
+        primary_rows.append(None)
+
+    rows = [[] for _ in ingredients]
+    for i_var, column in enumerate(columns):
+        for i_ing, number in column:
+            rows[i_ing].append((i_var, number))
+
+    variable_index = {name: i for i, name in enumerate(variables)}
+    return Recipe_Matrix(ingredients, ingredient_index, variables, variable_index, len(recipes), columns, rows, primary_rows, len(sinks))
+
+def sparse_recipe_matrix(recipe_matrix):
+    # returns the recipe matrix as a scipy.sparse csc float matrix, with rows ordered as recipe_matrix.ingredients, and columns as recipe_matrix.variables
+    #   duplicate entries (an ingredient in both inputs and outputs of one recipe) are summed by the conversion
+    import scipy.sparse  # optional dependancy, only required by the float backends
 
+    rows, cols, vals = [], [], []
+    for i_var, column in enumerate(recipe_matrix.columns):
+        for i_ing, number in column:
+            rows.append(i_ing)
+            cols.append(i_var)
+            vals.append(float(number))
+
+    return scipy.sparse.coo_matrix((vals, (rows, cols)), shape=(len(recipe_matrix.ingredients), len(recipe_matrix.variables))).tocsc()
 
 
 # the recipes form a system of linear expressions
@@ -468,114 +282,1427 @@ target = {ing.name: ing for ing in target}
 # recipe multipliers is a column vector of unique variables
 # goal is a column vector of mixed numbers and variables, described inline above
 
-# Finally, sympy seems easier to operate if we simply the system into a set of expressions equal to zero
-#   rather than try to have sympy handle the matrices directly
-# So we iterate a list of all ingredients, creating one expression for each
-expressions = []
-
-for expr_name in all_ingredients:
-    expression = 0
-
-    # add terms for each recipe if it includes this ingredient, in inputs or outputs
-    for recipe_name, r in recipes.items():
-        for ing in r.inputs:
-            if ing.name == expr_name:
-                expression -= ing.number * sym_vars.recipes[recipe_name]
-
-        for ing in r.outputs:
-            if ing.name == expr_name:
-                expression += ing.number * sym_vars.recipes[recipe_name]
-
-    # subtract goal value
-    #   all cases not covered have goal values of zero, so there is nothing to subbtract
-    if expr_name in raw_inputs:
-        expression += sym_vars.raw_inputs[expr_name]  # note sign is positive
-
-    elif expr_name in target:
-        expression -= target[expr_name].number
-
-    expressions.append(expression)
-
-# solve linear set of equations
-solution = sympy.linsolve(expressions, all_sym_vars)
-assert solution is not sympy.S.EmptySet
-assert len(solution) == 1, f'Did not produce a valid output. linsolve "Returns EmptySet, if the linear system is inconsistent."\n{solution}'
-
-solution = list(solution)[0]  # must cast to list before accessing elements, does not implement pop method
-assert len(solution) == len(all_sym_vars)
-
-# cast solution set to floats, from sympy internal (exact) representations
-_solution = []
-valid_types = [  # for conversion to float
-    sympy.core.numbers.Zero,
-    sympy.core.numbers.Rational,
-    sympy.core.numbers.Integer,
-    sympy.core.numbers.Float,
-]
-for val in solution:
-    assert type(val) in valid_types, f'unsupported type, {type(val)}, {val}'
-    _solution.append(float(val))
-
-# convert solution to list of production steps
-#   solution is ordered in order of all_sym_vars
-# iterate solution in multiple steps, since it contains both raw_inputs and recipe_multipliers which are handled differently
-steps = []
-i_sym_var = 0
-for _ in range(len(sym_vars.recipes)):
-    sym_var = all_sym_vars[i_sym_var]
-    recipe_multiplier = solution[i_sym_var]
-
-    recipe_name = sym_names.recipes[sym_var]
-    r = recipes[recipe_name]
-
-    if r.primary_output is not None:
-        output_number = r.primary_output.number
-    else:
-        output_number = 1  # do not scale recipes with zero outputs, by output rate
-
-    if not math.isclose(recipe_multiplier, 0, abs_tol=1e-9):
-        steps.append(ingredient(name = r.name, number = output_number * recipe_multiplier))
-
-    i_sym_var += 1
-
-for _ in range(len(sym_vars.raw_inputs)):
-    sym_var = all_sym_vars[i_sym_var]
-    number = solution[i_sym_var]
-    name = sym_names.raw_inputs[sym_var]
-
-    if not math.isclose(number, 0, abs_tol=1e-9):
-        steps.append(ingredient(name = name, number = number))
-
-    i_sym_var += 1
-
-
-
-
-# outfit steps with additional pruoduction line info
-production_lines = [production_line(step) for step in steps]
-
-# reverse topologically sort production lines
-#   ignore excess outputs to avoid cyclical dependancies
-#   always put raw_inputs first, regardless of when they are liberated in the topology
-_production_lines = []
-raw_input_lines = [line for line in production_lines if line.ing.name in raw_inputs]
-production_lines = [line for line in production_lines if line.ing.name not in raw_inputs]
-while production_lines:
-    # collect list of lines with no incoming dependancy edges
-    depended_upon = {ing.name for line in production_lines for ing in line.inputs}
-    not_depended_upon = [line for line in production_lines if line.ing.name not in depended_upon]
-    assert len(not_depended_upon) > 0, f'Failed to find any nodes without dependancies, {production_lines}'
-
-    # sort this subset of production lines, insert them into the new list, and clear from the original list
-    not_depended_upon.sort(key=lambda x: x.sort_key, reverse=True)
-    _production_lines += not_depended_upon
-    production_lines = [line for line in production_lines if line not in not_depended_upon]
-
-_production_lines += sorted(raw_input_lines, key=lambda x: x.sort_key, reverse=True)
-production_lines = list(reversed(_production_lines))
-
-# print production lines
-print(f'Production Lines ({len(production_lines)})')
-for line in production_lines:
-    print(str(line))
+# sparse LU factorization of the recipe matrix, for the scipy backend
+#   A is the recipe matrix, lu factorizes A itself if square, otherwise the normal equations A.T @ A
+Factorization = namedtuple('Factorization', ['A', 'lu', 'normal'])
+
+def factorize_matrix(A):
+    # returns the Factorization of the sparse matrix A
+    import scipy.sparse.linalg  # optional dependancy, only required by the float backends
+
+    # the system has more ingredients than variables whenever ingredients are unobtainable or only by-products
+    #   so factorize the normal equations, which are square, and have a unique solution exactly when the original system does
+    #   then check the residual of the original system, to verify it is consistent
+    normal = A.shape[0] != A.shape[1]
+    try:
+        lu = scipy.sparse.linalg.splu((A.T @ A).tocsc() if normal else A.tocsc())
+    except RuntimeError as e:
+        raise AssertionError(f'Did not produce a valid output. The recipe matrix is singular, the system has no unique solution, see planner.explore. {e}')
+
+    return Factorization(A, lu, normal)
+
+def lu_solve(factorization, goals):
+    # solves every goal column at once, as a multi-column right hand side, without checking the residuals
+    A, lu = factorization.A, factorization.lu
+    if not factorization.normal:
+        return lu.solve(goals)
+
+    solutions = lu.solve(A.T @ goals)
+    # the normal equations square the condition number, so recover the lost precision by iterative refinement
+    for _ in range(2):
+        solutions += lu.solve(A.T @ (goals - A @ solutions))
+    return solutions
+
+
+# on-disk cache of the scipy factorization of recipe systems
+#   one directory per recipe_hash, holding .npy arrays which are memory-mapped on load
+#   the factorization is stored as its L and U factors and permutations, and the recipe matrix A, in compressed sparse form
+# the recipe matrix itself is not cached, since compiling it takes about as long as hashing the recipes, and less than rebuilding it from arrays
+cache_version = 3
+
+def recipe_hash(recipes, raw_inputs, power_balance=False, sinks=()):
+    # content hash of the active recipes and raw_inputs, keying the on-disk cache
+    h = hashlib.sha256(f'calc_v2 cache {cache_version}'.encode())
+    for name, r in recipes.items():
+        h.update(repr((name, r.machine, str(r.rate),
+                       [(ing.name, str(ing.number)) for ing in r.inputs],
+                       [(ing.name, str(ing.number), ing.is_primary) for ing in r.outputs])).encode())
+    h.update(repr(list(raw_inputs)).encode())
+    if power_balance:
+        h.update(b'power balance')
+    h.update(repr(list(sinks)).encode())
+    return h.hexdigest()
+
+
+def save_arrays(path, arrays):
+    # writes each array to path/name.npy, via a temporary directory, so that readers never see a partial cache entry
+    import numpy  # optional dependancy, only required by the on-disk cache
+    import tempfile
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(path))
+    for name, array in arrays.items():
+        numpy.save(os.path.join(tmp, name + '.npy'), array)
+
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # another process wrote the same entry first
+        for name in os.listdir(tmp):
+            os.remove(os.path.join(tmp, name))
+        os.rmdir(tmp)
+
+
+def load_arrays(path):
+    # returns {name: array} of every array under path, memory-mapped, or None if path is not a cache entry
+    import numpy  # optional dependancy, only required by the on-disk cache
+
+    if not os.path.isdir(path):
+        return None
+    return {name[:-len('.npy')]: numpy.load(os.path.join(path, name), mmap_mode='r') for name in os.listdir(path) if name.endswith('.npy')}
+
+
+class cached_lu():
+    # stands in for a scipy SuperLU object, rebuilt from its cached factors
+    #   Pr @ M @ Pc = L @ U, so M x = b is solved by permuting b, two triangular solves, and permuting the result
+    def __init__(self, L, U, perm_r, perm_c):
+        self.L, self.U, self.perm_r, self.perm_c = L, U, perm_r, perm_c
+
+    def solve(self, b):
+        import numpy
+        import scipy.sparse.linalg
+
+        w = numpy.empty_like(b)
+        w[self.perm_r] = b
+        y = scipy.sparse.linalg.spsolve_triangular(self.L, w, lower=True, unit_diagonal=True)
+        y = scipy.sparse.linalg.spsolve_triangular(self.U, y, lower=False)
+        return y[self.perm_c]
+
+
+def save_factorization(path, factorization):
+    import numpy  # optional dependancy, only required by the on-disk cache
+
+    A, lu = factorization.A, factorization.lu
+    L, U = lu.L.tocsr(), lu.U.tocsr()
+    save_arrays(path, {
+        'shape': numpy.array(A.shape), 'normal': numpy.array(factorization.normal),
+        'A_indptr': A.indptr, 'A_indices': A.indices, 'A_data': A.data,
+        'L_indptr': L.indptr, 'L_indices': L.indices, 'L_data': L.data,
+        'U_indptr': U.indptr, 'U_indices': U.indices, 'U_data': U.data,
+        'perm_r': lu.perm_r, 'perm_c': lu.perm_c,
+    })
+
+
+def load_factorization(path):
+    # returns the cached Factorization, with a cached_lu, or None if not cached
+    import scipy.sparse
+
+    arrays = load_arrays(path)
+    if arrays is None:
+        return None
+
+    shape = tuple(arrays['shape'].tolist())
+    n = shape[1]
+    A = scipy.sparse.csc_matrix((arrays['A_data'], arrays['A_indices'], arrays['A_indptr']), shape=shape)
+    L = scipy.sparse.csr_matrix((arrays['L_data'], arrays['L_indices'], arrays['L_indptr']), shape=(n, n))
+    U = scipy.sparse.csr_matrix((arrays['U_data'], arrays['U_indices'], arrays['U_indptr']), shape=(n, n))
+    return Factorization(A, cached_lu(L, U, arrays['perm_r'], arrays['perm_c']), bool(arrays['normal']))
+
+
+# opt-in profiling of the pipeline phases, see phase_profile
+#   while no phase_profile is active, phase returns one shared no-op context manager, and profiled functions only check active_phase_profile
+active_phase_profile = None
+no_phase = contextlib.nullcontext()
+
+def phase(name):
+    # context manager around one named phase of the pipeline
+    if active_phase_profile is None:
+        return no_phase
+    return active_phase_profile.phase(name)
+
+
+def profiled(name):
+    # decorates a function as one named phase of the pipeline
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if active_phase_profile is None:
+                return f(*args, **kwargs)
+            with active_phase_profile.phase(name):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class phase_profile():
+    # records the wall time, call count, peak memory allocated and net memory blocks allocated, of each phase run within it
+    #   with phase_profile() as prof:
+    #       production_lines = p.solve(target)
+    #   print(prof.table())
+    # phases nest, and each phase's numbers include the phases it calls, like the recipe matrix built lazily by the first solve
+    # memory is traced with tracemalloc, which slows down python while the phase_profile is active
+    def __init__(self):
+        self.phases = {}  # {name: [seconds, calls, peak_bytes, blocks]}, in order of first call
+        self.stack = []  # [start memory, peak memory] of each running phase
+
+    def __enter__(self):
+        global active_phase_profile
+        assert active_phase_profile is None, 'phase profiles do not nest'
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        active_phase_profile = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global active_phase_profile
+        active_phase_profile = None
+        if self.started_tracing:
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        record = self.phases.setdefault(name, [0.0, 0, 0, 0])
+
+        # tracemalloc keeps one peak, so fold it into the running phase's peak before resetting it for this phase
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1][1] = max(self.stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        self.stack.append([current, current])
+
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record[0] += time.perf_counter() - start
+            record[1] += 1
+            record[3] += sys.getallocatedblocks() - blocks
+
+            start_memory, peak = self.stack.pop()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            record[2] = max(record[2], peak - start_memory)
+            if self.stack:
+                self.stack[-1][1] = max(self.stack[-1][1], peak)
+
+    def as_dict(self):
+        return {name: {'seconds': seconds, 'calls': calls, 'peak_bytes': peak_bytes, 'blocks': blocks}
+                for name, (seconds, calls, peak_bytes, blocks) in self.phases.items()}
+
+    def json(self):
+        return json.dumps(self.as_dict(), indent=2)
+
+    def table(self):
+        lines = [f'{"phase":18} {"calls":>6} {"seconds":>10} {"peak KiB":>10} {"blocks":>8}']
+        for name, (seconds, calls, peak_bytes, blocks) in self.phases.items():
+            lines.append(f'{name:18} {calls:6} {seconds:10.4f} {peak_bytes / 1024:10.1f} {blocks:8}')
+        return '\n'.join(lines)
+
+
+class lru():
+    # bounded mapping, evicting the least recently used entry beyond maxsize, counting hits and misses for monitoring
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        # returns the value of key, or None, if not cached
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        return {'size': len(self.entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+def target_dict(target):
+    # targets may be given as a list of ingredients, or as a dict of {name: ingredient}
+    if isinstance(target, dict):
+        return target
+    return {ing.name: ing for ing in target}
+
+
+# result of planner.max_throughput
+#   scale, the largest multiple of the target numbers which can be produced
+#   production_lines, the plan producing scale times the target
+#   binding, dict {raw input name: extra scale per extra unit of capacity}, of the capacities which limit scale
+#   usage, dict {raw input name: (used, capacity)}, of every capacity
+Throughput = namedtuple('Throughput', ['scale', 'production_lines', 'binding', 'usage'])
+
+# result of planner.explore
+#   dimension, of the null space of the recipe matrix, the degrees of freedom of the solution, 0 when it is unique
+#   vertices, list of Plan_Vertex, the extreme plans found, in order of cost
+#   complete, False when enumeration stopped at max_vertices, before finding every vertex within the cost bound
+Solution_Space = namedtuple('Solution_Space', ['dimension', 'vertices', 'complete'])
+
+# one extreme plan, with its lp_objective cost, total raw inputs per minute, total machines (at 100% clock), and ordered production lines
+Plan_Vertex = namedtuple('Plan_Vertex', ['cost', 'raw_inputs', 'machines', 'production_lines'])
+
+# result of planner.sensitivity, the marginal changes of a plan per extra unit (per minute) of each item
+#   raw_inputs, dict {item name: {raw input name: change}}, of the raw inputs which change
+#   machines, dict {item name: {machine: change}}, in machines at 100% clock, of the machine types which change
+#   marginal_cost, dict {item name: change in the lp_objective cost}, for the linprog backend the dual value (shadow price) of the item
+#   reduced_costs, for the linprog backend, dict {recipe name: cost increase per unit}, of the unused recipes for ingredients of the plan, cheapest first
+#     so the first are the recipe toggles which matter most. None for the other backends, whose recipe set is fixed
+Sensitivity = namedtuple('Sensitivity', ['raw_inputs', 'machines', 'marginal_cost', 'reduced_costs'])
+
+
+class planner():
+    # solves targets against one recipe system, with one of four backends, selected by solver_backend
+    #   'sympy' solves the system exactly, with rational arithmetic. Slow for large recipe sets
+    #   'exact' also solves the system exactly, by sparse elimination over fractions, without sympy, and much faster
+    #   'scipy' assembles the recipe matrix directly as a sparse float matrix, and solves it by sparse LU factorization
+    #   'linprog' allows more recipes than the system can uniquely determine, and picks the solution minimizing lp_objective, with HiGHS
+    #       it uses all recipes, including alternate_recipes
+    #       lp_objective 'raw inputs' minimizes raw input usage, weighted by raw_input_weights (default weight 1)
+    #       lp_objective 'machines' minimizes the total number of machines
+    #       lp_objective 'power' minimizes the total power consumption of machines, ignoring power generated
+    # the recipe database, compiled matrix, sympy symbols, fraction rows and factorization are each built lazily on first use, and cached
+    #   so a long running process can create one planner, and call solve repeatedly
+    # with cache_dir set, the scipy factorization is also cached on disk, keyed by recipe_hash
+    # alternates overrides whether alternate_recipes are included, by default only for the linprog backend
+    # database is the path of the recipe data file, by default recipes.json, and profile one of its recipe profiles, see load_recipes
+    #   so one process can plan with several recipe sets, each planner loading its own
+    # recipes replaces the recipe database with a dict {name: recipe}, for example with synthetic recipes, see bench.py
+    # power_balance adds a power row to the system, so generator recipes are scaled to cover the plan's own power consumption, see compile_recipes
+    #   the linear backends also need a generator fuel supply which is not already fixed by the plan, as with by-product fuel
+    #   the linprog backend can choose one from alternate_recipes
+    # sinks is a dict {name: cost}, adding a variable disposing of each named ingredient, at cost per unit in the linprog objective
+    #   so surplus by-products solve, as waste lines, see byproduct_sinks
+    #   the linear backends only solve when the sinks leave a unique solution, since they ignore costs
+    # solutions are kept in results, an lru of result_cache_size, serving repeats and positive multiples of earlier targets, see backend_solution
+    def __init__(self, solver_backend='sympy', lp_objective='raw inputs', raw_input_weights=None, cache_dir=None, alternates=None, recipes=None, power_balance=False, sinks=None, database=None, profile=None,
+                 result_cache_size=128):
+        assert solver_backend in ('sympy', 'exact', 'scipy', 'linprog'), f'unknown solver_backend, {solver_backend}'
+        assert lp_objective in ('raw inputs', 'machines', 'power'), f'unknown lp_objective, {lp_objective}'
+
+        self.solver_backend = solver_backend
+        self.lp_objective = lp_objective
+        self.raw_input_weights = raw_input_weights or {}
+        self.cache_dir = cache_dir
+        self.alternates = solver_backend == 'linprog' if alternates is None else alternates
+        self.power_balance = power_balance
+        self.sinks = sinks or {}
+        self.database = database
+        self.profile = profile
+        self.results = lru(result_cache_size)
+        if recipes is not None:
+            self.recipes = recipes  # takes the place of the cached property
+
+    @cached_property
+    @profiled('load recipes')
+    def recipes(self):
+        # dict {name: recipe} of the active recipes
+        recipes, alternate_recipes = load_recipes(self.database, self.profile)
+
+        # the linprog backend chooses between alternative recipes itself
+        recipes = list(recipes)
+        if self.alternates:
+            recipes += alternate_recipes
+
+        # verify we don't lose any recipes in the transformation (invalid user configuration)
+        l, names = len(recipes), [r.name for r in recipes]
+        recipes = {r.name : r for r in recipes}
+        assert l == len(recipes), f'Lost {l - len(recipes)} recipes! {sorted(names)}'
+
+        return recipes
+
+    @cached_property
+    def raw_inputs(self):
+        # raw input names of the recipe database, also used with replaced recipes
+        return list(recipe_data.load(self.database).raw_inputs)
+
+    @cached_property
+    def system_hash(self):
+        # recipe_hash of this planner's recipe system
+        return recipe_hash(self.recipes, self.raw_inputs, self.power_balance, tuple(self.sinks))
+
+    @cached_property
+    def cache_path(self):
+        # directory of this recipe system's on-disk cache entries, or None if disabled
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, self.system_hash)
+
+    @cached_property
+    @profiled('matrix build')
+    def recipe_matrix(self):
+        # compiled with the recipes' own numbers, so the exact backends stay exact
+        return compile_recipes(self.recipes, self.raw_inputs, self.power_balance, tuple(self.sinks))
+
+    @cached_property
+    def line_terms(self):
+        # list of (input_rows, input_numbers, excess_rows, excess_numbers), of each recipe's column of the recipe matrix, for production_line
+        #   inputs are negated to positive numbers, the primary output is left out of the excess outputs, and power is left out of both
+        recipe_matrix = self.recipe_matrix
+        power_row = recipe_matrix.ingredient_index.get(power_ingredient) if self.power_balance else None
+        line_terms = []
+        for column, primary_row in zip(recipe_matrix.columns[:recipe_matrix.n_recipes], recipe_matrix.primary_rows):
+            column = [(i_ing, number) for i_ing, number in column if i_ing != power_row]
+            inputs = [(i_ing, -number) for i_ing, number in column if number < 0]
+            excess_outputs = [(i_ing, number) for i_ing, number in column if number > 0 and i_ing != primary_row]
+            line_terms.append((tuple(i_ing for i_ing, _ in inputs), [number for _, number in inputs],
+                               tuple(i_ing for i_ing, _ in excess_outputs), [number for _, number in excess_outputs]))
+        return line_terms
+
+    @cached_property
+    def raw_rows(self):
+        # set of the ingredient rows of raw_inputs
+        recipe_matrix = self.recipe_matrix
+        return frozenset(recipe_matrix.primary_rows[recipe_matrix.n_recipes:len(recipe_matrix.variables) - recipe_matrix.n_sinks])
+
+    def goal_rows(self, target):
+        # returns dict {row: number} of target, leaving out raw_inputs, which have no goal
+        ingredient_index, raw_rows = self.recipe_matrix.ingredient_index, self.raw_rows
+        goal_rows = {}
+        for name, ing in target.items():
+            i_ing = ingredient_index[name]
+            if i_ing not in raw_rows:
+                goal_rows[i_ing] = ing.number
+        return goal_rows
+
+    @cached_property
+    @profiled('symbols')
+    def sym_vars(self):
+        # symbolic variables, ordered as recipe_matrix.variables
+        import sympy
+
+        n_recipes = self.recipe_matrix.n_recipes
+        sym_vars = [sympy.symbols('r_' + re.sub(r'\s+', '_', name)) for name in self.recipe_matrix.variables[:n_recipes]]
+        sym_vars += [sympy.symbols('i_' + re.sub(r'\s+', '_', name)) for name in self.recipe_matrix.variables[n_recipes:]]  # raw inputs and sinks
+        return sym_vars
+
+    @cached_property
+    def factorization(self):
+        if self.cache_path is None:
+            return self.factorize()
+
+        path = os.path.join(self.cache_path, 'factorization')
+        factorization = load_factorization(path)
+        if factorization is None:
+            factorization = self.factorize()
+            save_factorization(path, factorization)
+        return factorization
+
+    @profiled('factorize')
+    def factorize(self):
+        return factorize_matrix(sparse_recipe_matrix(self.recipe_matrix))
+
+    def check_target(self, target):
+        recipe_matrix = self.recipe_matrix
+        assert all(name in recipe_matrix.ingredient_index for name in target), f'No recipe uses or produces target, {[name for name in target if name not in recipe_matrix.ingredient_index]}'
+
+    def goal_vectors(self, targets):
+        # returns the goal column of each target, as the columns of a dense float matrix
+        import numpy  # optional dependancy, only required by the float backends
+
+        recipe_matrix = self.recipe_matrix
+        goals = numpy.zeros((len(recipe_matrix.ingredients), len(targets)))
+        for i_target, target in enumerate(targets):
+            self.check_target(target)
+            for i_ing, number in self.goal_rows(target).items():
+                goals[i_ing, i_target] = float(number)
+
+        return goals
+
+    @profiled('expressions')
+    def sympy_expressions(self, target):
+        import sympy
+
+        recipe_matrix, all_sym_vars = self.recipe_matrix, self.sym_vars
+
+        # sympy seems easier to operate if we simply the system into a set of expressions equal to zero
+        #   rather than try to have sympy handle the matrices directly
+        # So we create one expression for each ingredient row of the recipe matrix
+        #   raw_inputs columns are included in the rows, with positive sign
+        goal_rows = self.goal_rows(target)
+        expressions = []
+        for i_ing, row in enumerate(recipe_matrix.rows):
+            # recipe numbers are converted from their decimal representation, so that float numbers (like 2.5) stay exact
+            terms = [sympy.Rational(str(number)) * all_sym_vars[i_var] for i_var, number in row]
+
+            # subtract goal value
+            #   all cases not covered have goal values of zero, so there is nothing to subbtract
+            if i_ing in goal_rows:
+                terms.append(-sympy.Rational(str(goal_rows[i_ing])))
+
+            expressions.append(sympy.Add(*terms))
+
+        return expressions
+
+    def solve_sympy(self, target):
+        import sympy
+
+        self.check_target(target)
+        expressions = self.sympy_expressions(target)
+
+        # solve linear set of equations
+        with phase('linsolve'):
+            solution = sympy.linsolve(expressions, self.sym_vars)
+        assert solution is not sympy.S.EmptySet, 'Did not produce a valid output. linsolve "Returns EmptySet, if the linear system is inconsistent."'
+        assert len(solution) == 1, f'Did not produce a valid output. linsolve "Returns EmptySet, if the linear system is inconsistent."\n{solution}'
+        assert not any(val.free_symbols for val in list(solution)[0]), 'Did not produce a valid output. The system has no unique solution, see planner.explore'
+
+        solution = list(solution)[0]  # must cast to list before accessing elements, does not implement pop method
+        assert len(solution) == len(self.recipe_matrix.variables)
+
+        return solution
+
+    @cached_property
+    def fraction_rows(self):
+        # rows of the recipe matrix, as dicts {i_var: number}, with numbers as fractions
+        #   recipe numbers are converted from their decimal representation, so that float numbers (like 2.5) stay exact, as for sympy
+        fraction_rows = []
+        for row in self.recipe_matrix.rows:
+            fraction_row = defaultdict(Fraction)
+            for i_var, number in row:
+                fraction_row[i_var] += Fraction(str(number))
+            fraction_rows.append({i_var: number for i_var, number in fraction_row.items() if number})
+        return fraction_rows
+
+    def solve_exact(self, target):
+        # solves the system exactly, by sparse Gauss-Jordan elimination over fractions
+        # returns the solution as a list of fractions
+        self.check_target(target)
+        return self.solve_exact_goals([self.goal_rows(target)])[0]
+
+    @profiled('exact solve')
+    def solve_exact_goals(self, goals):
+        # solves every goal, a dict {row: number} as from goal_rows, with one elimination, carrying a right hand side column per goal
+        # returns a list of solutions, one per goal, each a list of fractions
+        rows = [dict(row) for row in self.fraction_rows]
+        rhs = [[Fraction(str(goal[i_ing])) if i_ing in goal else Fraction(0) for goal in goals] for i_ing in range(len(rows))]
+
+        col_rows = defaultdict(set)  # rows with an entry in each column
+        for i_row, row in enumerate(rows):
+            for i_var in row:
+                col_rows[i_var].add(i_row)
+
+        # eliminate the sparsest columns first, each by its sparsest remaining row, to limit fill-in
+        n_vars = len(self.recipe_matrix.variables)
+        pivots, free_rows = {}, set(range(len(rows)))
+        for i_var in sorted(range(n_vars), key=lambda i_var: len(col_rows[i_var])):
+            candidates = col_rows[i_var] & free_rows
+            if not candidates:
+                raise AssertionError(f'Did not produce a valid output. The recipe matrix is singular, the system has no unique solution, see planner.explore. No pivot for {self.recipe_matrix.variables[i_var]}')
+
+            i_pivot = min(candidates, key=lambda i_row: (len(rows[i_row]), i_row))
+            free_rows.remove(i_pivot)
+            pivots[i_var] = i_pivot
+
+            pivot_row = rows[i_pivot]
+            pivot = pivot_row[i_var]
+            if pivot != 1:
+                for k in pivot_row:
+                    pivot_row[k] /= pivot
+                rhs[i_pivot] = [number / pivot for number in rhs[i_pivot]]
+
+            for i_row in list(col_rows[i_var]):
+                if i_row == i_pivot:
+                    continue
+                row = rows[i_row]
+                factor = row[i_var]
+                for k, number in pivot_row.items():
+                    number = row.get(k, 0) - factor * number
+                    if number:
+                        row[k] = number
+                        col_rows[k].add(i_row)
+                    else:
+                        del row[k]
+                        col_rows[k].discard(i_row)
+                rhs[i_row] = [number - factor * pivot_number for number, pivot_number in zip(rhs[i_row], rhs[i_pivot])]
+
+        # every column is eliminated from the rows left over, so they are consistent exactly when their goals are zero
+        inconsistent = [self.recipe_matrix.ingredients[i_row] for i_row in sorted(free_rows) if any(rhs[i_row])]
+        assert not inconsistent, f'Did not produce a valid output. The system is inconsistent, for {inconsistent}'
+
+        return [[rhs[pivots[i_var]][i_goal] for i_var in range(n_vars)] for i_goal in range(len(goals))]
+
+    @profiled('factorized solve')
+    def solve_factorized(self, goals):
+        # solves every goal column at once, as a multi-column right hand side
+        # returns a list of solution arrays, one per goal column
+        import numpy  # optional dependancy, only required by the float backends
+
+        A = self.factorization.A
+        solutions = lu_solve(self.factorization, goals)
+
+        residuals = numpy.abs(A @ solutions - goals).max(axis=0, initial=0)
+        scales = numpy.maximum(1, numpy.abs(goals).max(axis=0, initial=0))
+        assert (residuals <= 1e-6 * scales).all(), f'Did not produce a valid output. The system is inconsistent, residuals {residuals}'
+
+        return list(solutions.T)
+
+    @cached_property
+    def lp_matrix(self):
+        return sparse_recipe_matrix(self.recipe_matrix)
+
+    @cached_property
+    def lp_costs(self):
+        # linprog objective cost per unit of each variable
+        import numpy  # optional dependancy, only required by the float backends
+
+        recipe_matrix = self.recipe_matrix
+        costs = numpy.zeros(len(recipe_matrix.variables))
+        n_sinks = recipe_matrix.n_sinks
+        for i_var, name in enumerate(recipe_matrix.variables):
+            if i_var >= len(recipe_matrix.variables) - n_sinks:
+                costs[i_var] = list(self.sinks.values())[i_var - len(recipe_matrix.variables) + n_sinks]
+                continue
+            if i_var >= recipe_matrix.n_recipes:
+                if self.lp_objective == 'raw inputs':
+                    costs[i_var] = self.raw_input_weights.get(name, 1)
+                continue
+
+            r = self.recipes[name]
+            output_number = 1 if r.primary_output is None else r.primary_output.number
+            num_machines = output_number / r.rate  # per unit recipe multiplier, as in production_line
+
+            if self.lp_objective == 'machines':
+                costs[i_var] = num_machines
+            elif self.lp_objective == 'power':
+                costs[i_var] = num_machines * max(machine_power[r.machine], 0)  # generated power would make the objective unbounded
+
+        return costs
+
+    def solve_linprog(self, target, disabled=()):
+        # disabled lists variable indices held at zero, so recipes can be switched off without rebuilding the problem
+        return self.linprog(target, disabled).x
+
+    @profiled('linprog')
+    def linprog(self, target, disabled=()):
+        # returns the scipy OptimizeResult of target, with the duals read by sensitivity
+        import scipy.optimize  # optional dependancy, only required for this backend
+
+        goal = self.goal_vectors([target])[:, 0]
+        bounds = [(0, 0) if i_var in disabled else (0, None) for i_var in range(len(self.recipe_matrix.variables))]
+
+        # every variable is non-negative, the recipe system holds with equality, as for the other backends
+        result = scipy.optimize.linprog(self.lp_costs, A_eq=self.lp_matrix, b_eq=goal, bounds=bounds, method='highs')
+        assert result.status == 0, f'Did not produce a valid output. {result.message}'
+
+        return result
+
+    def max_throughput(self, target, capacities):
+        # returns the Throughput of the largest multiple of target the recipes can produce, given capacities
+        #   capacities is a dict {raw input name: available number per minute}, other raw_inputs are unlimited
+        # solved as a linear program over the recipe system, maximizing the scale of the goal, with raw inputs bounded by their capacities
+        #   then among plans of that scale, the plan minimizing lp_objective, as for the linprog backend
+        import numpy  # optional dependancy, only required by the float backends
+        import scipy.optimize
+        import scipy.sparse
+
+        target = target_dict(target)
+        recipe_matrix = self.recipe_matrix
+        assert all(name in self.raw_inputs for name in capacities), f'capacities must be of raw_inputs, {[name for name in capacities if name not in self.raw_inputs]}'
+
+        goal = self.goal_vectors([target])
+        n_vars = len(recipe_matrix.variables)
+        bounds = [(0, None)] * n_vars
+        for name, capacity in capacities.items():
+            bounds[recipe_matrix.variable_index[name]] = (0, float(capacity))
+
+        # variables are the recipe system's, then the scale, so that A @ x - goal * scale = 0
+        costs = numpy.zeros(n_vars + 1)
+        costs[-1] = -1
+        result = scipy.optimize.linprog(costs, A_eq=scipy.sparse.hstack([self.lp_matrix, -goal]), b_eq=numpy.zeros(goal.shape[0]), bounds=bounds + [(0, None)], method='highs')
+        assert result.status != 3, 'Did not produce a valid output. Throughput is unbounded, no capacity limits the target'
+        assert result.status == 0, f'Did not produce a valid output. {result.message}'
+        scale = float(result.x[-1])
+
+        # extra target scale per extra unit of each binding capacity, from the marginals of the capacity bounds
+        #   a capacity which is used up, but with a zero marginal, like a capacity of 0 of an input the plan does not need, limits nothing
+        binding = {}
+        for name in capacities:
+            marginal = -float(result.upper.marginals[recipe_matrix.variable_index[name]])
+            if marginal > 1e-9:
+                binding[name] = marginal
+
+        # the cheapest plan of the maximum scale, with capacities relaxed by the solver's tolerance
+        x = result.x[:-1]
+        relaxed = [(low, None if high is None else high * (1 + 1e-9) + 1e-9) for low, high in bounds]
+        result = scipy.optimize.linprog(self.lp_costs, A_eq=self.lp_matrix, b_eq=goal[:, 0] * scale, bounds=relaxed, method='highs')
+        if result.status == 0:
+            x = result.x
+
+        # + 0.0 turns the solver's -0.0 into 0.0
+        usage = {name: (round(float(x[recipe_matrix.variable_index[name]]), 9) + 0.0, capacity) for name, capacity in capacities.items()}
+        production_lines = self.production_plan([round(float(v), 9) for v in x])
+        return Throughput(scale, production_lines, binding, usage)
+
+    def explore(self, target, cost_slack=0.5, max_vertices=100):
+        # returns the Solution_Space of target, enumerating the vertices of the feasible plans A @ x = goal, x >= 0, for recipe sets with alternates
+        #   each vertex is an extreme plan, which no mix of other plans reproduces
+        # enumeration is pruned to the plans costing at most (1 + cost_slack) times the cheapest plan, by lp_objective, and bounded by max_vertices
+        #   variables which are zero in every plan within the cost bound, like recipes unrelated to target, are dropped first, by one linprog each
+        #   since otherwise every vertex is degenerate, with very many bases
+        #   then starting from the cheapest vertex, it walks simplex pivots between bases, only through vertices within the cost bound
+        #   the vertices within any cost bound are connected by such pivots, so this finds all of them, unless stopped by max_vertices
+        import numpy  # optional dependancy, only required by the float backends
+        import scipy.linalg
+        import scipy.optimize
+
+        recipe_matrix = self.recipe_matrix
+        A, goal = self.lp_matrix.toarray(), self.goal_vectors([target_dict(target)])[:, 0]
+        costs = self.lp_costs
+        dimension = scipy.linalg.null_space(A).shape[1]
+
+        result = scipy.optimize.linprog(costs, A_eq=A, b_eq=goal, bounds=(0, None), method='highs')
+        assert result.status == 0, f'Did not produce a valid output. {result.message}'
+        cost_bound = result.fun + cost_slack * abs(result.fun) + 1e-9
+
+        # drop the variables which cannot be used within the cost bound
+        active = []
+        for i_var in range(A.shape[1]):
+            direction = numpy.zeros(A.shape[1])
+            direction[i_var] = -1
+            result = scipy.optimize.linprog(direction, A_ub=costs[None, :], b_ub=[cost_bound], A_eq=A, b_eq=goal, bounds=(0, None), method='highs')
+            if result.status == 3 or (result.status == 0 and -result.fun > 1e-9):
+                active.append(i_var)
+        A, costs = A[:, active], costs[active]
+
+        # then drop linearly dependent rows, which are redundant, since the system is consistent
+        _, R, row_order = scipy.linalg.qr(A.T, pivoting=True)
+        rank = int((numpy.abs(numpy.diag(R)) > 1e-9 * max(1, numpy.abs(R).max(initial=0))).sum())
+        rows = numpy.sort(row_order[:rank])
+        A, goal = A[rows], goal[rows]
+        n_vars = A.shape[1]
+
+        # extend the support of the cheapest vertex to a basis of independent columns
+        result = scipy.optimize.linprog(costs, A_eq=A, b_eq=goal, bounds=(0, None), method='highs-ds')
+        basis = [i_var for i_var in numpy.argsort(-result.x) if result.x[i_var] > 1e-9]
+        for i_var in range(n_vars):
+            if len(basis) == rank:
+                break
+            if i_var not in basis and numpy.linalg.matrix_rank(A[:, basis + [i_var]]) > len(basis):
+                basis.append(i_var)
+
+        vertices, seen_bases, queue = {}, {frozenset(basis)}, [basis]
+        complete = True
+        while queue:
+            basis = queue.pop(0)
+            B = A[:, basis]
+            x_basis = numpy.linalg.solve(B, goal)
+            x = numpy.zeros(n_vars)
+            x[basis] = x_basis
+            x[numpy.abs(x) < 1e-9] = 0
+
+            key = tuple(numpy.round(x, 6))
+            if key not in vertices:
+                if len(vertices) == max_vertices:
+                    complete = False
+                    break
+                vertices[key] = x
+
+            # pivot each non basic variable into the basis, leaving by the ratio test, with ties to the lowest index (Bland's rule)
+            directions = numpy.linalg.solve(B, A)
+            for i_enter in range(n_vars):
+                if i_enter in basis:
+                    continue
+                d = directions[:, i_enter]
+                ratios = [(x_basis[i] / d[i], basis[i], i) for i in range(rank) if d[i] > 1e-9]
+                if not ratios:
+                    continue  # an unbounded ray of plans, not a vertex
+                step, _, i_leave = min(ratios)
+                if costs @ x + step * (costs[i_enter] - costs[basis] @ d) > cost_bound:
+                    continue
+
+                next_basis = list(basis)
+                next_basis[i_leave] = i_enter
+                if frozenset(next_basis) not in seen_bases:
+                    seen_bases.add(frozenset(next_basis))
+                    queue.append(next_basis)
+
+        # report each vertex over all variables
+        machines = self.recipe_machines
+        raw_vars = [recipe_matrix.variable_index[name] for name in self.raw_inputs]
+
+        plans = []
+        for x_active in vertices.values():
+            x = numpy.zeros(len(recipe_matrix.variables))
+            x[active] = x_active
+            solution = [round(float(v), 9) for v in x]
+            plans.append(Plan_Vertex(float(costs @ x_active), float(x[raw_vars].sum()), float(machines @ x), self.production_plan(solution)))
+        plans.sort(key=lambda plan: plan.cost)
+        return Solution_Space(dimension, plans, complete)
+
+    @cached_property
+    def recipe_machines(self):
+        # machines at 100% clock per unit of each variable, as in production_line, zero for raw inputs and sinks
+        import numpy  # optional dependancy, only required by the float backends
+
+        recipe_matrix = self.recipe_matrix
+        machines = numpy.zeros(len(recipe_matrix.variables))
+        for i_var, name in enumerate(recipe_matrix.variables[:recipe_matrix.n_recipes]):
+            r = self.recipes[name]
+            machines[i_var] = (1 if r.primary_output is None else r.primary_output.number) / r.rate
+        return machines
+
+    @profiled('sensitivity')
+    def sensitivity(self, target, items=None):
+        # returns the Sensitivity of the plan for target, to one extra unit of each of items, by default every ingredient of target
+        # the solution is linear in the goal, so the change per unit of an item is the solution of a unit goal of that item, a column of the inverse matrix
+        #   the scipy backend solves the unit goals of all items at once, against its factorization
+        #   the sympy and exact backends solve them at once by exact elimination, as solve_exact_goals, since the answer is the same
+        #   and the linprog backend solves them against the columns of the recipes its plan for target uses (its basis)
+        #     with marginal_cost from the duals of its solution. Both hold for as long as that basis stays optimal
+        import numpy  # optional dependancy, only required by the float backends
+
+        target = target_dict(target)
+        items = list(target) if items is None else list(items)
+        recipe_matrix = self.recipe_matrix
+        units = [{name: ingredient(name, 1)} for name in items]
+        for unit in units:
+            self.check_target(unit)
+        assert not any(recipe_matrix.ingredient_index[name] in self.raw_rows for name in items), f'items must not be raw_inputs, {[name for name in items if name in self.raw_inputs]}'
+
+        reduced_costs = None
+        if self.solver_backend in ('sympy', 'exact'):
+            deltas = numpy.array([[float(x) for x in solution] for solution in self.solve_exact_goals([self.goal_rows(unit) for unit in units])])
+            marginal_costs = deltas @ self.lp_costs
+
+        elif self.solver_backend == 'scipy':
+            deltas = numpy.array(self.solve_factorized(self.goal_vectors(units)))
+            marginal_costs = deltas @ self.lp_costs
+
+        else:
+            result = self.linprog(target)
+            marginal_costs = result.eqlin.marginals[[recipe_matrix.ingredient_index[name] for name in items]]
+
+            basis = numpy.flatnonzero(result.x > 1e-9)
+            goals = self.goal_vectors(units)
+            B = self.lp_matrix[:, basis]
+            basis_deltas = lu_solve(factorize_matrix(B), goals)
+            residuals = numpy.abs(B @ basis_deltas - goals).max(axis=0, initial=0)
+            assert (residuals <= 1e-6).all(), f'Did not produce a valid output. The plan for target is degenerate, one more unit of {[name for name, r in zip(items, residuals) if r > 1e-6]} needs recipes it does not use'
+            deltas = numpy.zeros((len(items), len(recipe_matrix.variables)))
+            deltas[:, basis] = basis_deltas.T
+
+            # alternatives for the ingredients the plan makes, leaving out unrelated recipes, whose reduced costs are all zero
+            made = {i_ing for i_var in basis for i_ing, _ in recipe_matrix.columns[i_var]}
+            unused = [(round(float(result.lower.marginals[i_var]), 9), name) for i_var, name in enumerate(recipe_matrix.variables[:recipe_matrix.n_recipes])
+                      if result.x[i_var] <= 1e-9 and recipe_matrix.primary_rows[i_var] in made]
+            reduced_costs = {name: cost for cost, name in sorted(unused)}
+
+        # round away solver noise, as float_solution
+        raw_vars = [(name, recipe_matrix.variable_index[name]) for name in self.raw_inputs]
+        raw_inputs, machines = {}, {}
+        for name, delta in zip(items, deltas):
+            raw_inputs[name] = {raw_name: round(float(delta[i_var]), 9) for raw_name, i_var in raw_vars if round(float(delta[i_var]), 9)}
+            by_machine = defaultdict(float)
+            for i_var, recipe_name in enumerate(recipe_matrix.variables[:recipe_matrix.n_recipes]):
+                if delta[i_var]:
+                    by_machine[self.recipes[recipe_name].machine] += float(delta[i_var] * self.recipe_machines[i_var])
+            machines[name] = {machine: round(number, 9) for machine, number in sorted(by_machine.items(), key=lambda item: machine_rank[item[0]]) if round(number, 9)}
+
+        return Sensitivity(raw_inputs, machines, {name: round(float(cost), 9) for name, cost in zip(items, marginal_costs)}, reduced_costs)
+
+    def backend_solution(self, target):
+        # returns the solution for target, in the backend's own number type, ordered as recipe_matrix.variables
+        # the system is linear, so the solution of a multiple of a target is the same multiple of its solution
+        #   and the linprog optimum scales too, for positive multiples, since its costs and constraints do
+        #   so solutions are cached by the direction of their goal, and served scaled, or unchanged for repeats
+        target = target_dict(target)
+        self.check_target(target)
+        direction, scale = self.normalized_goal(target)
+        if direction is None:
+            return self.solve_backend(target)
+
+        cached = self.results.get(direction)
+        if cached is not None:
+            solution, cached_scale = cached
+            return self.scaled_solution(solution, scale / cached_scale)
+
+        solution = self.solve_backend(target)
+        self.results.put(direction, (solution, scale))
+        return self.scaled_solution(solution, 1)
+
+    def normalized_goal(self, target):
+        # returns (direction, scale) of target's goal rows, so that goal = scale * direction, with the direction's first number of magnitude 1
+        #   or (None, None) for a target without goal rows
+        # numbers are converted from their decimal representation, as for the exact backends, so equal targets have equal directions
+        goal = sorted((i_ing, Fraction(str(number))) for i_ing, number in self.goal_rows(target).items() if number)
+        if not goal:
+            return None, None
+        scale = abs(goal[0][1])
+        return tuple((i_ing, number / scale) for i_ing, number in goal), scale
+
+    def scaled_solution(self, solution, ratio):
+        # returns a new solution, of solution times the fraction ratio, in the backend's own number type
+        if self.solver_backend == 'sympy':
+            import sympy
+            ratio = sympy.Rational(ratio.numerator, ratio.denominator)
+            return tuple(x * ratio for x in solution)
+        elif self.solver_backend == 'exact':
+            return [x * ratio for x in solution]
+        return solution * float(ratio)
+
+    def solve_backend(self, target):
+        # solves target with the solver backend, without the result cache
+        if self.solver_backend == 'sympy':
+            return self.solve_sympy(target)
+        elif self.solver_backend == 'exact':
+            return self.solve_exact(target)
+        elif self.solver_backend == 'scipy':
+            return self.solve_factorized(self.goal_vectors([target]))[0]
+        else:
+            return self.solve_linprog(target)
+
+    @profiled('float conversion')
+    def float_solution(self, solution):
+        # casts a backend solution to a list of floats
+        if self.solver_backend == 'exact':
+            return [float(x) for x in solution]
+        elif self.solver_backend != 'sympy':
+            # round away factorization and solver noise, so that exact values (like 43.125) format identically to the sympy backend
+            return [round(float(x), 9) for x in solution]
+
+        # cast solution set to floats, from sympy internal (exact) representations
+        import sympy
+
+        _solution = []
+        valid_types = [  # for conversion to float
+            sympy.core.numbers.Zero,
+            sympy.core.numbers.Rational,
+            sympy.core.numbers.Integer,
+            sympy.core.numbers.Float,
+        ]
+        for val in solution:
+            assert type(val) in valid_types, f'unsupported type, {type(val)}, {val}'
+            _solution.append(float(val))
+
+        return _solution
+
+    def solution(self, target):
+        # returns the solution for target, a list of floats ordered as recipe_matrix.variables
+        return self.float_solution(self.backend_solution(target))
+
+    def solve(self, target):
+        # returns the ordered list of production lines for target
+        return self.production_plan(self.solution(target))
+
+    def solve_batch(self, targets):
+        # returns one ordered list of production lines per target, in the order of targets
+        # the scipy backend solves all targets together against its one factorization, as a multi-column right hand side
+        #   the exact backend solves them together with one elimination, and the other backends solve each target separately
+        targets = [target_dict(target) for target in targets]
+        if self.solver_backend == 'scipy':
+            solutions = [self.float_solution(solution) for solution in self.solve_factorized(self.goal_vectors(targets))]
+        elif self.solver_backend == 'exact':
+            for target in targets:
+                self.check_target(target)
+            solutions = [self.float_solution(solution) for solution in self.solve_exact_goals([self.goal_rows(target) for target in targets])]
+        else:
+            solutions = [self.solution(target) for target in targets]
+
+        return [self.production_plan(solution) for solution in solutions]
+
+    def solve_iter(self, targets, block_size=256):
+        # yields the ordered list of production lines of each target, in the order of targets, as solve_batch
+        #   targets may be a generator, and are solved block_size at a time, so long sweeps run in constant memory, see plan_writer
+        targets = iter(targets)
+        while True:
+            block = [target for _, target in zip(range(block_size), targets)]
+            if not block:
+                return
+            yield from self.solve_batch(block)
+
+    def production_plan(self, solution):
+        # returns the ordered list of production lines for a solution
+        return order_production_lines(self.unordered_production_lines(solution))
+
+    @profiled('production lines')
+    def unordered_production_lines(self, solution):
+        # returns the production lines for a solution, in the order of recipe_matrix.variables
+        #   solution is ordered in order of recipe_matrix.variables, recipe multipliers first, then raw_inputs
+
+        # convert solution to list of production steps, of (i_var, number)
+        steps = []
+        for i_var, (name, number) in enumerate(zip(self.recipe_matrix.variables, solution)):
+            if i_var < self.recipe_matrix.n_recipes:
+                r = self.recipes[name]
+
+                if r.primary_output is not None:
+                    number *= r.primary_output.number  # otherwise, do not scale recipes with zero outputs, by output rate
+
+            if not math.isclose(number, 0, abs_tol=1e-9):
+                steps.append((i_var, number))
+
+        # outfit steps with additional pruoduction line info
+        return [production_line(i_var, number, self) for i_var, number in steps]
+
+
+@profiled('ordering')
+def order_production_lines(production_lines):
+    # returns production lines reverse topologically sorted, so that each line comes after the lines producing its inputs
+    #   ignore excess outputs to avoid cyclical dependancies
+    #   always put raw_inputs first, regardless of when they are liberated in the topology
+    # Kahn's algorithm, over a prebuilt index of the lines consuming each ingredient row (in_degree) and producing it (producers)
+    #   lines are released in layers, of all lines no longer depended upon, each layer sorted by sort_key, as a stable tie-break
+    #   and waste lines last, in their own section
+    raw_input_lines = [line for line in production_lines if line.is_raw_input]
+    waste_lines = [line for line in production_lines if line.is_waste]
+    production_lines = [line for line in production_lines if not line.is_raw_input and not line.is_waste]
+
+    producers = defaultdict(list)
+    for line in production_lines:
+        producers[line.output_row].append(line)
+
+    in_degree = defaultdict(int)  # number of unreleased lines consuming each ingredient, by row
+    for line in production_lines:
+        for i_ing in set(line.input_rows):
+            in_degree[i_ing] += 1
+
+    _production_lines = sorted(waste_lines, key=lambda x: x.sort_key, reverse=True)
+    layer = [line for line in production_lines if in_degree[line.output_row] == 0]
+    while layer:
+        # sort this layer of production lines, insert them into the new list, and release their inputs
+        layer.sort(key=lambda x: x.sort_key, reverse=True)
+        _production_lines += layer
+
+        next_layer = []
+        for line in layer:
+            for i_ing in set(line.input_rows):
+                in_degree[i_ing] -= 1
+                if in_degree[i_ing] == 0:
+                    next_layer += producers.get(i_ing, [])
+        layer = next_layer
+
+    if len(_production_lines) < len(production_lines) + len(waste_lines):
+        raise AssertionError(f'Failed to find any nodes without dependancies, production lines form a cycle, {dependency_cycle(production_lines, _production_lines)}')
+
+    _production_lines += sorted(raw_input_lines, key=lambda x: x.sort_key, reverse=True)
+    return list(reversed(_production_lines))
+
+
+def dependency_cycle(production_lines, released):
+    # returns the names of the lines on dependency cycles, given the lines Kahn's algorithm released
+    #   the unreleased lines are those on cycles, and those which cycles depend upon, so trim the latter
+    #   by repeatedly releasing lines whose inputs are not produced by any remaining line
+    released = {id(line) for line in released}
+    remaining = [line for line in production_lines if id(line) not in released]
+
+    while True:
+        produced = {line.output_row for line in remaining}
+        trimmed = [line for line in remaining if any(i_ing in produced for i_ing in line.input_rows)]
+        if len(trimmed) == len(remaining):
+            return sorted(line.ing.name for line in remaining)
+        remaining = trimmed
+
+
+# one production line's change between two plans, by line name, with numbers of 0 for lines added or removed
+Line_Change = namedtuple('Line_Change', ['name', 'before', 'after'])
+
+def plan_changes(before, after):
+    # returns the list of Line_Change between two ordered lists of production lines, in the order of after, then lines removed
+    numbers_before = {line.ing.name: float(line.ing.number) for line in before}
+    numbers_after = {line.ing.name: float(line.ing.number) for line in after}
+
+    changes = []
+    for name, number in numbers_after.items():
+        if not math.isclose(numbers_before.get(name, 0), number, abs_tol=1e-9):
+            changes.append(Line_Change(name, numbers_before.get(name, 0), number))
+    for name, number in numbers_before.items():
+        if name not in numbers_after:
+            changes.append(Line_Change(name, number, 0))
+
+    return changes
+
+
+def plan_power(production_lines):
+    # returns (consumed, generated) power of production lines, with machines at 100% clock, in MW
+    consumed, generated = 0, 0
+    for line in production_lines:
+        if not line.is_raw_input and not line.is_waste:
+            power = machine_power[line.recipe.machine] * line.num_machines
+            if power > 0:
+                consumed += power
+            else:
+                generated -= power
+    return consumed, generated
+
+
+class plan_writer():
+    # streams production plans to file, as json lines or csv rows, as each plan is written, without building the whole report first
+    #   'jsonl' writes one object per production line, the fields of production_line.as_dict, with the plan it belongs to
+    #   'csv' writes one row per ingredient of each line, in columns csv_fields, the line's output, then its inputs, then its recycled outputs
+    #     raw input and waste lines only have their output row
+    # plan names the plan of each line, for example a target name or an index, when several plans share one file
+    csv_fields = ['plan', 'line', 'kind', 'recipe', 'machine', 'machines', 'role', 'ingredient', 'number']
+
+    def __init__(self, file, format='jsonl'):
+        assert format in ('jsonl', 'csv'), f'unknown format, {format}'
+        self.file = file
+        self.format = format
+        if format == 'csv':
+            import csv
+            self.csv = csv.writer(file)
+            self.csv.writerow(self.csv_fields)
+
+    def write_plan(self, production_lines, plan=None):
+        # writes one plan, given as production lines, or as their as_dict records
+        for i_line, line in enumerate(production_lines):
+            if isinstance(line, production_line):
+                line = line.as_dict()
+
+            if self.format == 'jsonl':
+                self.file.write(json.dumps({'plan': plan, 'line': i_line, **line}) + '\n')
+                continue
+
+            head = [plan, i_line, line['kind'], line.get('recipe'), line.get('machine'), line.get('machines')]
+            self.csv.writerow(head + ['output', line['name'], line['number']])
+            for role, ingredients in (('input', line.get('inputs', {})), ('recycle', line.get('recycle', {}))):
+                for name, number in ingredients.items():
+                    self.csv.writerow(head + [role, name, number])
+
+    def write_plans(self, plans):
+        # writes (plan, production lines) pairs, as they are generated
+        for plan, production_lines in plans:
+            self.write_plan(production_lines, plan)
+
+
+def plan_record(production_lines):
+    # returns a plan as plain data, for json output, with its totals of raw inputs, machines by type (at 100% clock), and power in MW
+    machines = {}
+    for line in production_lines:
+        if not line.is_raw_input and not line.is_waste:
+            machines[line.recipe.machine] = machines.get(line.recipe.machine, 0) + line.num_machines
+    consumed, generated = plan_power(production_lines)
+    return {'raw_inputs': {line.output_name: line.ing.number for line in production_lines if line.is_raw_input},
+            'machines': machines,
+            'power': {'consumed': consumed, 'generated': generated},
+            'production_lines': [line.as_dict() for line in production_lines]}
+
+
+def assert_non_negative(production_lines):
+    # a plan can only run recipes forwards, so production lines with negative numbers have no physical meaning
+    negative = [line.ing.name for line in production_lines if line.ing.number < 0]
+    assert not negative, f'Did not produce a valid output. The plan runs production lines backwards, {negative}'
+
+
+# integer machine count of one production line, with every machine running at clock, and their total power in MW
+#   over_provisioned lines need less than one machine at min_clock, so run at min_clock, making more than the plan needs
+Machine_Count = namedtuple('Machine_Count', ['name', 'machine', 'machines', 'clock', 'power', 'over_provisioned'])
+
+def clocked_power(machine, machines, clock):
+    # returns the power of machines running at clock, in MW. Negative for generators
+    power = machine_power[machine]
+    if power < 0:
+        return machines * power * clock
+    return machines * power * clock ** overclock_exponent
+
+
+def machine_counts(production_lines, objective='buildings', clock_limit=max_clock, max_buildings=None):
+    # returns a list of Machine_Count, turning the fractional num_machines of each production line into an integer number of clocked machines
+    #   raw inputs and waste are left out
+    #   clocks are never below min_clock, lines needing less are clamped to it, and marked over_provisioned
+    # objective 'buildings' uses the fewest machines, overclocking each line up to clock_limit
+    # objective 'power' then adds machines one at a time, to the line saving the most power, while fewer than max_buildings in total
+    #   max_buildings defaults to the number of machines the plan needs at 100% clock, spent where they save the most power
+    #   since power per line is convex in its number of machines, adding greedily minimizes total power, for the number of machines
+    assert objective in ('buildings', 'power'), f'unknown objective, {objective}'
+    assert min_clock <= clock_limit <= max_clock, f'clock_limit must be between {min_clock} and {max_clock}, {clock_limit}'
+
+    lines = [line for line in production_lines if not line.is_raw_input and not line.is_waste]
+    num_machines = [float(line.num_machines) for line in lines]
+
+    # the fewest machines, with a tolerance, so that solver noise does not add a machine
+    machines = [max(1, math.ceil(n / clock_limit - 1e-9)) for n in num_machines]
+
+    if objective == 'power':
+        if max_buildings is None:
+            max_buildings = sum(max(1, math.ceil(n - 1e-9)) for n in num_machines)
+
+        def saving(i_line):
+            # power saved by adding one machine to the line, as a negative number for heapq, or None if it would clock below min_clock
+            n, machine = machines[i_line], lines[i_line].recipe.machine
+            if num_machines[i_line] / (n + 1) < min_clock:
+                return None
+            return clocked_power(machine, n + 1, num_machines[i_line] / (n + 1)) - clocked_power(machine, n, num_machines[i_line] / n)
+
+        heap = [(saving(i_line), i_line) for i_line in range(len(lines))]
+        heap = [x for x in heap if x[0] is not None and x[0] < 0]
+        heapq.heapify(heap)
+        buildings = sum(machines)
+        while heap and buildings < max_buildings:
+            _, i_line = heapq.heappop(heap)
+            machines[i_line] += 1
+            buildings += 1
+
+            next_saving = saving(i_line)
+            if next_saving is not None and next_saving < 0:
+                heapq.heappush(heap, (next_saving, i_line))
+
+    counts = []
+    for line, n, m in zip(lines, machines, num_machines):
+        clock = max(m / n, min_clock)
+        counts.append(Machine_Count(line.ing.name, line.recipe.machine, n, clock, clocked_power(line.recipe.machine, n, clock), m / n < min_clock))
+    return counts
+
+
+class session():
+    # incremental re-solving, for interactive planning loops which change one target number, or toggle one recipe, at a time
+    #   keeps the current factorization, target and solution, and returns each new plan with its changes from the previous plan
+    # the scipy backend keeps the factorization of the planner's recipe system
+    #   a changed target only needs a new right hand side solve
+    #   recipes enabled from alternate_recipes, or disabled, are handled by a low rank (bordered system) update of that factorization
+    # the linprog backend keeps its problem matrices, and holds disabled recipes at zero by their bounds
+    def __init__(self, planner_, target):
+        assert planner_.solver_backend in ('scipy', 'linprog'), f'incremental solving is not supported by the {planner_.solver_backend} backend'
+
+        self.planner = planner_
+        self.target = dict(target_dict(target))
+
+        # the system of all candidate recipes, active ones first, then alternates, then raw inputs
+        if planner_.alternates:
+            self.system = planner_
+        else:
+            self.system = planner(planner_.solver_backend, planner_.lp_objective, planner_.raw_input_weights, planner_.cache_dir, alternates=True, power_balance=planner_.power_balance, sinks=planner_.sinks,
+                                  database=planner_.database, profile=planner_.profile)
+
+        # names of candidate recipes which differ from the planner's active set
+        self.enabled = set()
+        self.disabled = set()
+
+        self.update = None  # low rank update terms, rebuilt when the enabled or disabled recipes change
+        self.production_lines = []
+        self.solve()
+
+    def set_target(self, name, number):
+        # changes the target number of one ingredient, removing it from the target at 0
+        # returns the new production lines, and a list of Line_Change from the previous plan
+        target = dict(self.target)
+        if number:
+            target[name] = ingredient(name = name, number = number)
+        else:
+            target.pop(name, None)
+
+        return self.solve(target = target)
+
+    def set_recipe(self, name, enabled):
+        # enables or disables one recipe, see set_recipes
+        return self.set_recipes({name: enabled})
+
+    def set_recipes(self, toggles):
+        # enables or disables recipes, given as a dict {name: enabled}
+        #   swapping one recipe for an alternate should be done in one call, since either toggle alone usually has no unique solution
+        # returns the new production lines, and a list of Line_Change from the previous plan
+        active = self.planner.recipes
+        enabled, disabled = set(self.enabled), set(self.disabled)
+        for name, enable in toggles.items():
+            assert name in self.system.recipes, f'unknown recipe, {name}'
+            if name in active:
+                (disabled.discard if enable else disabled.add)(name)
+            else:
+                (enabled.add if enable else enabled.discard)(name)
+
+        return self.solve(enabled = enabled, disabled = disabled)
+
+    def solve(self, target=None, enabled=None, disabled=None):
+        # re-solves with any given changes, which are only kept when the new system solves
+        target = self.target if target is None else target
+        enabled = self.enabled if enabled is None else enabled
+        disabled = self.disabled if disabled is None else disabled
+
+        update = self.update
+        if self.planner.solver_backend == 'linprog':
+            variable_index = self.system.recipe_matrix.variable_index
+            solution = self.system.float_solution(self.system.solve_linprog(target, {variable_index[name] for name in disabled}))
+        else:
+            if update is None or enabled != self.enabled or disabled != self.disabled:
+                update = self.low_rank_update(enabled, disabled)
+            solution = self.solve_updated(target, update)
+
+        production_lines = self.system.production_plan(solution)
+        assert_non_negative(production_lines)
+        self.target, self.enabled, self.disabled, self.update = target, enabled, disabled, update
+
+        changes = plan_changes(self.production_lines, production_lines)
+        self.production_lines = production_lines
+        return production_lines, changes
+
+    @cached_property
+    def base(self):
+        # the planner's recipe system, embedded in the candidate system
+        #   cols, candidate variable index of each planner variable
+        #   A, the planner's recipe matrix, over the candidate system's ingredient rows
+        #   lu, factorizes N = A.T @ A. The row order of A does not change N, so the planner's normal factorization is reused
+        import scipy.sparse.linalg  # optional dependancy, only required for this backend
+
+        variable_index = self.system.recipe_matrix.variable_index
+        cols = [variable_index[name] for name in self.planner.recipe_matrix.variables]
+        A = self.system.lp_matrix[:, cols]
+
+        if self.planner.factorization.normal:
+            lu = self.planner.factorization.lu
+        else:
+            lu = scipy.sparse.linalg.splu((A.T @ A).tocsc())
+
+        return {'cols': cols, 'A': A, 'lu': lu}
+
+    def normal_solve(self, rhs):
+        # solves N @ z = rhs
+        return self.base['lu'].solve(rhs)
+
+    def low_rank_update(self, enabled, disabled):
+        # the recipe system with recipes enabled (columns C) and disabled (selected by unit columns E) solves the bordered system
+        #   [ N    B   E ] [ x      ]   [ A.T @ b ]
+        #   [ B.T  D   0 ] [ y      ] = [ C.T @ b ]
+        #   [ E.T  0   0 ] [ lambda ]   [ 0       ]
+        # where B = A.T @ C, D = C.T @ C, x are the planner's variables, and y the enabled recipes
+        # so with W = N^-1 @ [B E], the small Schur complement S = [[D, 0], [0, 0]] - [B E].T @ W gives [y, lambda] and then x
+        import numpy
+
+        base = self.base
+        variable_index = self.system.recipe_matrix.variable_index
+        enabled_cols = [variable_index[name] for name in sorted(enabled)]
+        disabled_rows = [base['cols'].index(variable_index[name]) for name in sorted(disabled)]
+
+        A = base['A']
+        C = self.system.lp_matrix[:, enabled_cols].toarray()
+        E = numpy.zeros((A.shape[1], len(disabled_rows)))
+        E[disabled_rows, range(len(disabled_rows))] = 1
+
+        BE = numpy.hstack([A.T @ C, E])
+        W = self.normal_solve(BE) if BE.shape[1] else BE
+        k = len(enabled_cols)
+        S = -BE.T @ W
+        S[:k, :k] += C.T @ C
+
+        # S is singular, in the scale of its inputs, when an enabled column is (nearly) a combination of the system's others
+        #   as when an alternate is enabled next to the active recipe for the same output
+        # so compare it scaled by the norms of the enabled columns, D, and of the disabled block of N^-1, which is never singular
+        #   the condition number alone cannot tell, it is exactly 1 for any nonzero 1 x 1 S
+        scales = numpy.sqrt(numpy.concatenate([numpy.diag(S[:k, :k] + BE[:, :k].T @ W[:, :k]), -numpy.diag(S[k:, k:])]))
+        if BE.shape[1] and numpy.linalg.svd(S / numpy.outer(scales, scales), compute_uv=False).min() < 1e-9:
+            raise AssertionError(f'Did not produce a valid output. The recipe matrix is singular, the system has no unique solution. enabled {sorted(enabled)}, disabled {sorted(disabled)}')
+
+        return {'enabled_cols': enabled_cols, 'C': C, 'BE': BE, 'W': W, 'S': S}
+
+    def bordered_solve(self, update, top, middle, bottom):
+        # solves the bordered system of low_rank_update, for right hand sides [top, middle, bottom], returning x and y
+        import numpy
+
+        BE, W, S = update['BE'], update['W'], update['S']
+        k = len(update['enabled_cols'])
+
+        x = self.normal_solve(top)
+        if not BE.shape[1]:
+            return x, numpy.zeros(0)
+
+        y_lambda = numpy.linalg.solve(S, numpy.concatenate([middle, bottom]) - BE.T @ x)
+        return x - W @ y_lambda, y_lambda[:k]
+
+    def solve_updated(self, target, update):
+        import numpy
+
+        base = self.base
+        b = self.system.goal_vectors([target])[:, 0]
+        A, C, E = base['A'], update['C'], update['BE'][:, len(update['enabled_cols']):]
+
+        x, y = self.bordered_solve(update, A.T @ b, C.T @ b, numpy.zeros(E.shape[1]))
+
+        # the normal equations square the condition number, so recover the lost precision by iterative refinement
+        #   against the residual of the original system, and the disabled recipes' constraint
+        for _ in range(2):
+            r = b - A @ x - C @ y
+            dx, dy = self.bordered_solve(update, A.T @ r, C.T @ r, -E.T @ x)
+            x += dx
+            y += dy
+
+        residual = numpy.abs(A @ x + C @ y - b).max(initial=0)
+        assert residual <= 1e-6 * max(1, numpy.abs(b).max(initial=0)), f'Did not produce a valid output. The system is inconsistent, residual {residual}'
+
+        # assemble the solution over the candidate system's variables
+        solution = numpy.zeros(len(self.system.recipe_matrix.variables))
+        solution[base['cols']] = x
+        solution[update['enabled_cols']] = y
+
+        return self.system.float_solution(solution)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Prints the production lines for the target set in main')
+    parser.add_argument('--timings', nargs = '?', const = 'table', choices = ['table', 'json'], help = 'print the time and memory of each phase to stderr, see phase_profile')
+    parser.add_argument('--format', default = 'text', choices = ['text', 'jsonl', 'csv'], help = 'print the production lines as text, or as json lines or csv rows, see plan_writer')
+    args = parser.parse_args()
+
+    # target specific product
+    # target = [ingredient(name = 'computer', number = 5)]
+    # target = [ingredient(name = 'modular engine', number = Fraction(500, 120))]
+    # target = [ingredient(name = 'adaptive control unit', number = 1)]
+    # target = [ingredient(name = 'turbofuel', number = Fraction('4.5')*20)]
+    # target = [ingredient(name = 'alclad aluminum sheet', number = 100),
+    #           ingredient(name = 'aluminum casing', number = 100),
+    #           ingredient(name = 'radio control unit', number = 5),
+    #           ]
+    target = [ingredient(name = 'supercomputer', number = Fraction('1.875'))]
+
+    with phase_profile() if args.timings else contextlib.nullcontext() as prof:
+        # solver backend, 'exact' (fractions), 'sympy' (exact, slow), 'scipy' (sparse float, fast), or 'linprog' (optimizer over all recipes), see planner
+        # cache_dir, for example '.calc_cache', caches the scipy factorization on disk between runs (requires numpy)
+        p = planner(solver_backend = 'exact', cache_dir = None)
+        production_lines = p.solve(target)
+
+        # recipe profile example, with the recipe set of the calc_v1 profile of recipes.json, see recipe_data.py
+        # production_lines = planner(solver_backend = 'exact', profile = 'calc_v1').solve([ingredient(name = 'aluminum ingot', number = 100)])
+
+        # by-product sink example, disposing of surplus by-products as waste lines, rather than burning all surplus fuel
+        # production_lines = planner(solver_backend = 'linprog', sinks = byproduct_sinks(planner().recipes)).solve(target)
+
+        # solution space example, the extreme plans using alternate recipes, within 10% of the fewest raw inputs
+        # for plan in planner(solver_backend = 'linprog').explore(target, cost_slack = 0.1).vertices:
+        #     print(f'{plan.raw_inputs:.1f} raw inputs, {plan.machines:.1f} machines')
+
+        # max throughput example, the most supercomputers per minute from limited ore nodes, and the capacities limiting it
+        # throughput = planner(solver_backend = 'linprog').max_throughput([ingredient(name = 'supercomputer', number = 1)], {'copper ore': 300, 'caterium ore': 240, 'oil': 300})
+        # print(throughput.scale, throughput.binding)
+
+        # sensitivity example, what one more supercomputer costs, in raw inputs and machines, from the solved system
+        # sensitivity = planner(solver_backend = 'exact').sensitivity(target)
+        # print(sensitivity.marginal_cost['supercomputer'], sensitivity.raw_inputs['supercomputer'], sensitivity.machines['supercomputer'])
+
+        # batch example, solving several targets against one factorization
+        # plans = planner(solver_backend = 'scipy').solve_batch([[ingredient(name = 'supercomputer', number = rate)] for rate in (1.875, 3.75, 7.5)])
+
+        # sweep example, streaming the plan of each rate as csv rows, as they are solved
+        # rates = [i / 8 for i in range(1, 10001)]
+        # plans = planner(solver_backend = 'scipy').solve_iter([ingredient(name = 'supercomputer', number = rate)] for rate in rates)
+        # plan_writer(sys.stdout, 'csv').write_plans(zip(rates, plans))
+
+        # print production lines
+        with phase('printing'):
+            if args.format != 'text':
+                plan_writer(sys.stdout, args.format).write_plan(production_lines)
+            else:
+                print(f'Production Lines ({len(production_lines)})')
+                for line in production_lines:
+                    print(str(line))
+
+        # integer machine counts and clock speeds, for building the plan
+        # for count in machine_counts(production_lines, objective = 'power'):
+        #     print(f'{count.machines} x {count.machine} at {count.clock:.2%} for {count.name}, {count.power:.1f} MW')
 
+    if args.timings:
+        print(prof.table() if args.timings == 'table' else prof.json(), file = sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
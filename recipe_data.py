@@ -0,0 +1,135 @@
+# recipe database, loaded from a json data file, by default recipes.json next to this file, and shared by calc_v1.py and calc_v2.py
+#   machines, in production line order, with their power consumption at 100% clock, in MW. Negative for generators
+#   raw_inputs, the ingredient names which are mined or extracted, rather than produced by a recipe
+#   recipes, each with
+#     name, optional, by default the name of its primary output. Required for recipes without one, like power generation
+#     inputs, outputs and byproducts, as {ingredient name: number}. outputs holds the primary output, if any, byproducts the other outputs
+#     rate, of the primary output per minute, per machine
+#     machine
+#     enabled, optional, by default true. Disabled recipes are the alternate recipes, which only the linprog backend uses by default
+#   profiles, named recipe sets, as {'enable': [recipe names], 'disable': [recipe names]}, applied over each recipe's enabled flag
+# files are validated on load, and cached per path until they change on disk, so a long running process can switch databases and profiles freely
+
+# imports
+import json
+import os
+from collections import namedtuple
+
+
+default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recipes.json')
+data_version = 1
+
+# inputs, outputs and byproducts are tuples of (name, number)
+Recipe_Data = namedtuple('Recipe_Data', ['name', 'inputs', 'outputs', 'byproducts', 'rate', 'machine', 'enabled'])
+
+
+class recipe_database():
+    # a loaded data file. Hashed by identity, so users can cache what they build from it, see calc_v2.build_recipes
+    #   machines is a tuple of (name, power), raw_inputs a tuple of names, recipes a tuple of Recipe_Data, profiles a dict {name: (enable, disable)}
+    __slots__ = ('path', 'machines', 'raw_inputs', 'recipes', 'profiles')
+
+    def __init__(self, path, machines, raw_inputs, recipes, profiles):
+        self.path = path
+        self.machines = machines
+        self.raw_inputs = raw_inputs
+        self.recipes = recipes
+        self.profiles = profiles
+
+    def profile_recipes(self, profile=None):
+        # returns tuples (enabled, disabled) of Recipe_Data, in file order, with profile's toggles applied, or with None, only the enabled flags
+        assert profile is None or profile in self.profiles, f'unknown recipe profile, {profile}, expected one of {sorted(self.profiles)}'
+        enable, disable = self.profiles.get(profile, ((), ()))
+        enabled = [r for r in self.recipes if (r.enabled or r.name in enable) and r.name not in disable]
+        disabled = [r for r in self.recipes if not ((r.enabled or r.name in enable) and r.name not in disable)]
+        return tuple(enabled), tuple(disabled)
+
+
+# {absolute path: ((mtime, size), recipe_database)}
+cache = {}
+
+def load(path=None):
+    # returns the recipe_database of the data file at path, by default default_path
+    #   cached, and only read again when the file's modification time or size changes
+    path = os.path.abspath(path or default_path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        data = json.load(f)
+    database = parse(data, path)
+    cache[path] = (stamp, database)
+    return database
+
+
+def is_number(x):
+    # json numbers, excluding true and false, which python reads as ints
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+
+def parse_ingredients(data, field, where):
+    # returns a tuple of (name, number) of the {name: number} field of a recipe
+    assert isinstance(data, dict), f'{where}: {field} must be an object of ingredient name: number'
+    for name, number in data.items():
+        assert is_number(number) and number > 0, f'{where}: {field} {name} must be a positive number, not {number!r}'
+    return tuple(data.items())
+
+
+def parse(data, path='<data>'):
+    # returns the recipe_database of the decoded json data, asserting it is valid
+    assert isinstance(data, dict), f'{path}: expected an object at the top level'
+    unknown = set(data) - {'version', 'machines', 'raw_inputs', 'recipes', 'profiles'}
+    assert not unknown, f'{path}: unknown fields {sorted(unknown)}'
+    assert data.get('version') == data_version, f'{path}: unsupported version {data.get("version")!r}, expected {data_version}'
+
+    # machines
+    machines = []
+    for i, machine in enumerate(data.get('machines', [])):
+        assert isinstance(machine, dict) and set(machine) == {'name', 'power'}, f'{path}: machines[{i}] must be an object of name and power'
+        assert isinstance(machine['name'], str) and is_number(machine['power']), f'{path}: machines[{i}] has an invalid name or power'
+        machines.append((machine['name'], machine['power']))
+    machine_names = {name for name, _ in machines}
+    assert len(machine_names) == len(machines), f'{path}: duplicate machine names'
+
+    # raw inputs
+    raw_inputs = data.get('raw_inputs', [])
+    assert isinstance(raw_inputs, list) and all(isinstance(name, str) for name in raw_inputs), f'{path}: raw_inputs must be a list of names'
+    assert len(set(raw_inputs)) == len(raw_inputs), f'{path}: duplicate raw_inputs'
+
+    # recipes
+    recipes = []
+    for i, r in enumerate(data.get('recipes', [])):
+        where = f'{path}: recipes[{i}]'
+        assert isinstance(r, dict), f'{where} must be an object'
+        unknown = set(r) - {'name', 'inputs', 'outputs', 'byproducts', 'rate', 'machine', 'enabled'}
+        assert not unknown, f'{where}: unknown fields {sorted(unknown)}'
+
+        outputs = parse_ingredients(r.get('outputs', {}), 'outputs', where)
+        assert len(outputs) <= 1, f'{where}: multiple primary outputs, {[name for name, _ in outputs]}, list the others as byproducts'
+        name = r.get('name', outputs[0][0] if outputs else None)
+        assert isinstance(name, str), f'{where}: recipes without a primary output must be named'
+        where = f'{path}: recipe {name}'
+
+        inputs = parse_ingredients(r.get('inputs', {}), 'inputs', where)
+        byproducts = parse_ingredients(r.get('byproducts', {}), 'byproducts', where)
+        assert is_number(r.get('rate')) and r['rate'] > 0, f'{where}: rate must be a positive number, not {r.get("rate")!r}'
+        assert r.get('machine') in machine_names, f'{where}: unknown machine {r.get("machine")!r}'
+        enabled = r.get('enabled', True)
+        assert isinstance(enabled, bool), f'{where}: enabled must be true or false'
+
+        recipes.append(Recipe_Data(name, inputs, outputs, byproducts, r['rate'], r['machine'], enabled))
+    recipe_names = {r.name for r in recipes}
+    assert len(recipe_names) == len(recipes), f'{path}: duplicate recipe names, {sorted(r.name for r in recipes if sum(s.name == r.name for s in recipes) > 1)}'
+
+    # profiles
+    profiles = {}
+    for name, profile in data.get('profiles', {}).items():
+        assert isinstance(profile, dict) and set(profile) <= {'enable', 'disable'}, f'{path}: profile {name} must be an object of enable and disable lists'
+        enable, disable = frozenset(profile.get('enable', ())), frozenset(profile.get('disable', ()))
+        assert enable | disable <= recipe_names, f'{path}: profile {name} names unknown recipes, {sorted((enable | disable) - recipe_names)}'
+        profiles[name] = (enable, disable)
+
+    return recipe_database(path, tuple(machines), tuple(raw_inputs), tuple(recipes), profiles)
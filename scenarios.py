@@ -0,0 +1,169 @@
+# scenario runner, solving many recipe-toggle x target combinations with calc_v2.py, across a process pool
+# scenarios are json lines, each {"name": optional, "target": {ingredient name: number}, "toggles": {recipe name: enabled}}
+#   given as one file, or as the product of a file of targets and a file of toggle sets, each line of those with only its own fields
+#   toggles enable alternate recipes, or disable active ones, relative to the planner's recipe set
+# each worker process compiles the recipe system once, in init_worker, and keeps it for every scenario it is sent
+#   the scipy and linprog backends re-solve each scenario incrementally, with a calc_v2.session
+#   the sympy and exact backends keep one planner per toggle set
+# toggle sets without a unique solution, and plans with negative lines, are reported in the error field of their scenario
+# results stream back in scenario order, so the output is the same for any number of workers, as one json line per scenario
+#   or with --format csv, as the csv rows of calc_v2.plan_writer, with the scenario name as the plan
+#   python scenarios.py --targets targets.jsonl --toggle-sets toggles.jsonl --jobs 8 --output results.jsonl
+
+# imports
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+import calc_v2
+
+
+def read_jsonl(path):
+    # yields the records of a json lines file, skipping blank lines
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def scenario_product(targets, toggle_sets):
+    # yields the scenario of every target and toggle set, targets outermost, naming each 'target name / toggle set name'
+    toggle_sets = list(toggle_sets)
+    for i_target, target in enumerate(targets):
+        for i_toggles, toggles in enumerate(toggle_sets):
+            name = f'{target.get("name", i_target)} / {toggles.get("name", i_toggles)}'
+            yield {'name': name, 'target': target['target'], 'toggles': toggles.get('toggles', {})}
+
+
+# state of each worker process, set by init_worker
+worker = {}
+max_planners = 32
+
+def init_worker(planner_args):
+    # builds the worker's planner, and compiles its recipe system, once per process
+    p = calc_v2.planner(**planner_args)
+    worker['planner'] = p
+    worker['planners'] = {}  # {toggle set: planner}, for the sympy and exact backends
+    if p.solver_backend in ('scipy', 'linprog'):
+        worker['session'] = calc_v2.session(p, [])
+    else:
+        worker['session'] = None
+        p.recipe_matrix
+
+
+def toggled_planner(toggles):
+    # the worker's planner for a toggle set, for the backends without incremental solving
+    key = frozenset(toggles.items())
+    if key not in worker['planners']:
+        # keep the most recent max_planners, each holds its own compiled recipe system
+        if len(worker['planners']) >= max_planners:
+            del worker['planners'][next(iter(worker['planners']))]
+
+        p = worker['planner']
+        if not key:
+            worker['planners'][key] = p
+        else:
+            recipes = dict(p.recipes)
+            _, alternate_recipes = calc_v2.load_recipes(p.database, p.profile)
+            candidates = {r.name: r for r in alternate_recipes}
+            for name, enabled in toggles.items():
+                assert name in recipes or name in candidates, f'unknown recipe, {name}'
+                if enabled:
+                    recipes[name] = recipes.get(name) or candidates[name]
+                else:
+                    recipes.pop(name, None)
+            worker['planners'][key] = calc_v2.planner(p.solver_backend, p.lp_objective, p.raw_input_weights, p.cache_dir, recipes=recipes,
+                                                      power_balance=p.power_balance, sinks=p.sinks, database=p.database, profile=p.profile)
+    return worker['planners'][key]
+
+
+def evaluate(item):
+    # solves one scenario, in a worker process, returning its result record
+    #   failures, like a toggle set with no unique solution, are reported in the record's error field rather than raised
+    #   as are invalid scenario lines, so one bad line does not abort the sweep
+    index, scenario = item
+    record = {'index': index, 'name': scenario.get('name', index), 'target': scenario.get('target'), 'toggles': scenario.get('toggles', {})}
+    try:
+        assert isinstance(scenario.get('target'), dict), 'expected {"target": {ingredient name: number}}'
+        for name, number in scenario['target'].items():
+            assert isinstance(number, (int, float)) and not isinstance(number, bool), f'target number of {name} must be a number, not {number!r}'
+        target = [calc_v2.ingredient(name = name, number = number) for name, number in scenario['target'].items()]
+        assert isinstance(scenario.get('toggles', {}), dict), 'expected {"toggles": {recipe name: enabled}}'
+
+        if worker['session'] is not None:
+            s = worker['session']
+            toggles = scenario.get('toggles', {})
+            for name in toggles:
+                assert name in s.system.recipes, f'unknown recipe, {name}'
+            active = s.planner.recipes
+            enabled = {name for name, enable in toggles.items() if enable and name not in active}
+            disabled = {name for name, enable in toggles.items() if not enable and name in active}
+            production_lines, _ = s.solve(calc_v2.target_dict(target), enabled, disabled)
+        else:
+            production_lines = toggled_planner(scenario.get('toggles', {})).solve(target)
+            # as the session checks its own plans, so a scenario fails the same way with every backend
+            calc_v2.assert_non_negative(production_lines)
+    except (AssertionError, KeyError, ValueError, TypeError) as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+        return record
+
+    record.update(calc_v2.plan_record(production_lines))
+    return record
+
+
+def run_scenarios(scenarios, planner_args, jobs=None, chunksize=16):
+    # yields the result record of each scenario, in order, solving them across jobs worker processes (default, one per cpu)
+    #   scenarios may be a generator, and are only read as workers need them, so large sweeps run in constant memory
+    #   with jobs=1, solves in this process, without a pool
+    scenarios = enumerate(scenarios)
+    if jobs == 1:
+        init_worker(planner_args)
+        yield from map(evaluate, scenarios)
+        return
+
+    with multiprocessing.Pool(jobs, initializer=init_worker, initargs=(planner_args,)) as pool:
+        yield from pool.imap(evaluate, scenarios, chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Solves recipe-toggle x target scenarios with calc_v2.py, across a process pool, writing one json line per scenario')
+    parser.add_argument('scenarios', nargs = '?', help = 'json lines file of scenarios, each {"name", "target", "toggles"}')
+    parser.add_argument('--targets', help = 'json lines file of targets, each {"name", "target"}, solved with every toggle set')
+    parser.add_argument('--toggle-sets', help = 'json lines file of toggle sets, each {"name", "toggles"}, by default only the planner\'s recipe set')
+    parser.add_argument('--backend', default = 'scipy', choices = ['sympy', 'exact', 'scipy', 'linprog'], help = 'calc_v2 solver backend, see planner')
+    parser.add_argument('--lp-objective', default = 'raw inputs', choices = ['raw inputs', 'machines', 'power'])
+    parser.add_argument('--database', help = 'recipe data file, by default recipes.json')
+    parser.add_argument('--profile', help = 'recipe profile of the data file')
+    parser.add_argument('--cache-dir', help = 'on-disk cache of the scipy factorization, shared by the workers')
+    parser.add_argument('--jobs', type = int, default = os.cpu_count(), help = 'worker processes, 1 solves without a pool')
+    parser.add_argument('--chunksize', type = int, default = 16, help = 'scenarios sent to a worker at a time')
+    parser.add_argument('--format', default = 'jsonl', choices = ['jsonl', 'csv'], help = 'one json line per scenario, or csv rows of the production lines of every scenario, see calc_v2.plan_writer, with failed scenarios reported to stderr')
+    parser.add_argument('--output', help = 'output file, by default stdout')
+    args = parser.parse_args()
+
+    assert (args.scenarios is None) != (args.targets is None), 'give either a scenarios file, or --targets'
+    if args.scenarios is not None:
+        scenarios = read_jsonl(args.scenarios)
+    else:
+        toggle_sets = read_jsonl(args.toggle_sets) if args.toggle_sets else [{'name': 'default'}]
+        scenarios = scenario_product(read_jsonl(args.targets), toggle_sets)
+
+    planner_args = {'solver_backend': args.backend, 'lp_objective': args.lp_objective, 'cache_dir': args.cache_dir, 'database': args.database, 'profile': args.profile}
+    out = open(args.output, 'w', newline = '') if args.output else sys.stdout
+    writer = calc_v2.plan_writer(out, 'csv') if args.format == 'csv' else None
+    for record in run_scenarios(scenarios, planner_args, args.jobs, args.chunksize):
+        if writer is None:
+            print(json.dumps(record), file = out)
+        elif 'error' in record:
+            print(f'{record["name"]}: {record["error"]}', file = sys.stderr)
+        else:
+            writer.write_plan(record['production_lines'], record['name'])
+
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# local http planning service, keeping calc_v2.py planners warm between requests, with only the standard library
+#   python server.py --port 8000
+#   curl -s localhost:8000/plan -d '{"target": {"supercomputer": 1.875}}'
+# endpoints, all returning json
+#   POST /plan, with {"target": {ingredient name: number}, "profile": optional recipe profile, "format": optional "json" or "csv"}
+#     returns calc_v2.plan_record of the plan, with the recipe_hash of its recipe system, and whether it was served from the cache
+#     or with "format": "csv", the rows of calc_v2.plan_writer
+#   GET /profiles, the recipe profiles of the recipe data file
+#   GET /health, the result cache stats, and the solution cache stats of each planner kept warm, by profile
+# failures are returned with status 400, as {"error": message}, or 500 for unexpected errors
+#   plans with negative lines, as from negative target numbers, are failures
+# one planner is kept per recipe profile, built on first use, and rebuilt when the recipe data file changes on disk
+#   the default profile's planner is built, and its system compiled, at startup
+# plans are cached in an LRU of --cache-size, keyed by (recipe_hash, target)
+# requests are handled one at a time, as the planners are not thread safe
+
+# imports
+import argparse
+import io
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import calc_v2
+import recipe_data
+
+
+class planning_service():
+    # the warm planners and result cache of the server
+    def __init__(self, solver_backend='exact', database=None, cache_size=256, cache_dir=None):
+        self.solver_backend = solver_backend
+        self.database = database
+        self.cache_dir = cache_dir
+        self.planners = {}  # {profile: (recipe_database, planner)}
+        self.results = calc_v2.lru(cache_size)
+
+    def planner(self, profile=None):
+        # the warm planner of profile, rebuilt when the recipe data file has changed
+        database = recipe_data.load(self.database)
+        cached = self.planners.get(profile)
+        if cached is None or cached[0] is not database:
+            p = calc_v2.planner(solver_backend = self.solver_backend, cache_dir = self.cache_dir, database = self.database, profile = profile)
+            p.recipe_matrix
+            if self.solver_backend == 'scipy':
+                p.factorization
+            cached = self.planners[profile] = (database, p)
+        return cached[1]
+
+    def plan(self, request):
+        # returns the response of a /plan request, as a dict
+        assert isinstance(request, dict) and isinstance(request.get('target'), dict), 'expected {"target": {ingredient name: number}}'
+        for name, number in request['target'].items():
+            assert isinstance(number, (int, float)) and not isinstance(number, bool), f'target number of {name} must be a number, not {number!r}'
+        # the planners are kept by profile, so an unhashable profile would fail outside the error handling
+        assert request.get('profile') is None or isinstance(request['profile'], str), f'profile must be a recipe profile name, not {request["profile"]!r}'
+
+        p = self.planner(request.get('profile'))
+        key = (p.system_hash, tuple(sorted((name, float(number)) for name, number in request['target'].items())))
+        response = self.results.get(key)
+        if response is not None:
+            return {**response, 'cached': True}
+
+        target = [calc_v2.ingredient(name = name, number = number) for name, number in request['target'].items()]
+        production_lines = p.solve(target)
+        calc_v2.assert_non_negative(production_lines)
+        response = {'recipe_hash': p.system_hash, **calc_v2.plan_record(production_lines)}
+        self.results.put(key, response)
+        return {**response, 'cached': False}
+
+    def health(self):
+        return {'status': 'ok', 'solver_backend': self.solver_backend, 'cache': self.results.stats(),
+                'planners': {str(profile): p.results.stats() for profile, (_, p) in self.planners.items()}}
+
+
+class request_handler(BaseHTTPRequestHandler):
+    # routes requests to the server's planning_service
+    def send_json(self, status, data):
+        self.send_body(status, 'application/json', json.dumps(data).encode())
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == '/health':
+            self.send_json(200, service.health())
+        elif self.path == '/profiles':
+            self.send_json(200, {'profiles': sorted(recipe_data.load(service.database).profiles)})
+        else:
+            self.send_json(404, {'error': f'unknown path, {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/plan':
+            self.send_json(404, {'error': f'unknown path, {self.path}'})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            response = self.server.service.plan(request)
+        except (AssertionError, KeyError, ValueError) as e:
+            self.send_json(400, {'error': f'{type(e).__name__}: {e}'})
+            return
+        except Exception as e:
+            # any other failure still gets a response, rather than dropping the connection
+            self.send_json(500, {'error': f'{type(e).__name__}: {e}'})
+            return
+
+        if request.get('format') == 'csv':
+            out = io.StringIO()
+            calc_v2.plan_writer(out, 'csv').write_plan(response['production_lines'])
+            self.send_body(200, 'text/csv', out.getvalue().encode())
+        else:
+            self.send_json(200, response)
+
+
+def make_server(host='127.0.0.1', port=8000, **service_args):
+    # returns the HTTPServer, with its planning_service warmed up, without serving yet. port 0 picks a free port, see server_address
+    server = HTTPServer((host, port), request_handler)
+    server.service = planning_service(**service_args)
+    server.service.planner()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Serves calc_v2.py production plans over http, as json, keeping the solver warm between requests')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8000)
+    parser.add_argument('--backend', default = 'exact', choices = ['sympy', 'exact', 'scipy', 'linprog'], help = 'calc_v2 solver backend, see planner')
+    parser.add_argument('--database', help = 'recipe data file, by default recipes.json')
+    parser.add_argument('--cache-size', type = int, default = 256, help = 'plans kept in the result cache')
+    parser.add_argument('--cache-dir', help = 'on-disk cache of scipy factorizations')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, solver_backend = args.backend, database = args.database, cache_size = args.cache_size, cache_dir = args.cache_dir)
+    print(f'serving on http://{server.server_address[0]}:{server.server_address[1]}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main()
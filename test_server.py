@@ -0,0 +1,68 @@
+# checks of the server.py planning service, over http on a free local port, run with python -m pytest
+
+# imports
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import server
+
+
+@pytest.fixture(scope='module')
+def url():
+    s = server.make_server(port = 0)
+    thread = threading.Thread(target = s.serve_forever, daemon = True)
+    thread.start()
+    yield f'http://{s.server_address[0]}:{s.server_address[1]}'
+    s.shutdown()
+    s.server_close()
+
+
+def request(url, path, body=None):
+    # returns (status, decoded json response) of a GET, or with body, a POST
+    data = None if body is None else json.dumps(body).encode()
+    try:
+        with urllib.request.urlopen(url + path, data) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_repeated_plan_is_cached(url):
+    body = {'target': {'supercomputer': 1.875}}
+    status, first = request(url, '/plan', body)
+    assert status == 200 and first['cached'] is False
+    status, second = request(url, '/plan', body)
+    assert status == 200 and second['cached'] is True
+    assert {**first, 'cached': True} == second
+
+
+@pytest.mark.parametrize('profile', ['not a profile', ['default'], {'name': 'default'}])
+def test_bad_profile(url, profile):
+    status, response = request(url, '/plan', {'target': {'supercomputer': 1.875}, 'profile': profile})
+    assert status == 400 and 'profile' in response['error']
+
+
+@pytest.mark.parametrize('target', [{'supercomputer': -1}, {'supercomputer': 'x'}])
+def test_bad_target(url, target):
+    status, response = request(url, '/plan', {'target': target})
+    assert status == 400 and 'error' in response
+
+
+def test_unexpected_error(url):
+    status, response = request(url, '/plan', {'target': {'supercomputer': 1e308}})
+    assert status == 500 and 'error' in response
+
+
+def test_health_cache_stats(url):
+    body = {'target': {'computer': 2.5}}
+    request(url, '/plan', body)
+    request(url, '/plan', body)
+    status, health = request(url, '/health')
+    assert status == 200 and health['status'] == 'ok'
+    assert health['cache']['hits'] >= 1 and health['cache']['misses'] >= 1
+    assert health['cache']['size'] <= health['cache']['maxsize']
+    assert 'None' in health['planners']
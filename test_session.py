@@ -0,0 +1,32 @@
+# regression checks of calc_v2.session, run with python -m pytest
+#   an alternate enabled next to the active recipe for the same output leaves no unique solution
+#   the session must report it, as the exact backend does, rather than return a plan with negative lines
+
+# imports
+import pytest
+
+import calc_v2
+
+target = [calc_v2.ingredient(name = 'supercomputer', number = 1.875)]
+
+
+@pytest.mark.parametrize('name', ['fused wire', 'cast screw'])
+def test_enable_alternate_without_disabling_active(name):
+    s = calc_v2.session(calc_v2.planner('scipy'), target)
+    with pytest.raises(AssertionError, match='singular'):
+        s.set_recipe(name, True)
+
+    with pytest.raises(AssertionError, match='singular'):
+        recipes = dict(calc_v2.planner('exact').recipes)
+        recipes[name] = calc_v2.planner('exact', alternates=True).recipes[name]
+        calc_v2.planner('exact', recipes=recipes).solve(target)
+
+    # the failed toggle is not kept
+    assert s.enabled == set() and s.disabled == set()
+
+
+def test_swap_alternate_for_active():
+    s = calc_v2.session(calc_v2.planner('scipy'), target)
+    production_lines, _ = s.set_recipes({'fused wire': True, 'wire': False})
+    assert all(line.ing.number >= 0 for line in production_lines)
+    assert 'fused wire' in {line.ing.name for line in production_lines}